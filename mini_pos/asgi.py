@@ -3,4 +3,15 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mini_pos.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up.
+from pos.stockstream import STREAM_PATH, sse_app  # noqa: E402
+
+
+async def application(scope, receive, send):
+    # The live stock stream bypasses Django's request cycle so that idle
+    # connections are just a waiting coroutine and disconnects are seen.
+    if scope["type"] == "http" and scope["path"] == STREAM_PATH:
+        return await sse_app(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -82,7 +82,9 @@ else:
 AUTH_PASSWORD_VALIDATORS = []
 
 LANGUAGE_CODE = "en-us"
-TIME_ZONE = "UTC"
+# The shop's local time (WIB). Days, hours and rollups are bucketed in this
+# zone; run rebuild_rollups after changing it.
+TIME_ZONE = os.environ.get("TIME_ZONE", "Asia/Jakarta")
 USE_I18N = True
 USE_L10N = True
 USE_TZ = True
@@ -103,9 +105,64 @@ STORAGES = {
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
-# Simple API key for protecting lightweight JSON endpoints in development.
-# Override by setting the environment variable MINI_POS_API_KEY in production.
+# Shared API key accepted next to the per-terminal ApiKey rows (see
+# pos.apikeys). Override with MINI_POS_API_KEY in production, or set it to
+# an empty string once every terminal has its own key.
 API_KEY = os.environ.get("MINI_POS_API_KEY", "dev-secret-change-me")
+# Rate limit of the shared key (requests per second, burst size) and how
+# long (seconds) each process caches the ApiKey table.
+API_KEY_RATE = float(os.environ.get("API_KEY_RATE", 20))
+API_KEY_BURST = int(os.environ.get("API_KEY_BURST", 100))
+API_KEY_CACHE_TTL = int(os.environ.get("API_KEY_CACHE_TTL", 60))
+
+# How long (seconds) an Idempotency-Key on the order API is remembered.
+IDEMPOTENCY_KEY_TTL = int(os.environ.get("IDEMPOTENCY_KEY_TTL", 24 * 60 * 60))
+
+# Background report exports: where finished files are kept, how many
+# render threads run inside the web process (0 = leave it to the
+# run_export_worker command) and when a stuck job is given up on.
+EXPORT_DIR = BASE_DIR / "exports"
+EXPORT_WORKERS_IN_PROCESS = int(os.environ.get("EXPORT_WORKERS_IN_PROCESS", 1))
+EXPORT_JOB_TIMEOUT = int(os.environ.get("EXPORT_JOB_TIMEOUT", 60 * 60))
+
+# On-disk receipt PDF cache (LRU, evicted past the size limit).
+RECEIPT_CACHE_DIR = BASE_DIR / "cache" / "receipts"
+RECEIPT_CACHE_MAX_BYTES = int(
+    os.environ.get("RECEIPT_CACHE_MAX_BYTES", 50 * 1024 * 1024)
+)
+
+# Whether paginated lists show an exact total (one COUNT(*) per request).
+# Turn off on very large tables; pages themselves never need the count.
+PAGINATION_EXACT_COUNT = os.environ.get("PAGINATION_EXACT_COUNT", "True") == "True"
+
+# Where the analytics page reads from: "rollups" (pre-aggregated tables) or
+# "numpy" (in-process columnar store, needs numpy; adds heatmap, basket
+# size and discount breakdowns).
+ANALYTICS_BACKEND = os.environ.get("ANALYTICS_BACKEND", "rollups")
+
+# Live best sellers (pos.topk): products tracked per day/hour sketch and
+# how often (seconds) each process syncs its counts with the database.
+TOPK_CAPACITY = int(os.environ.get("TOPK_CAPACITY", 100))
+TOPK_FLUSH_INTERVAL = int(os.environ.get("TOPK_FLUSH_INTERVAL", 30))
+
+# Max age (seconds) of the in-memory product autocomplete index. Changes
+# saved in the same process invalidate it immediately.
+SUGGEST_INDEX_TTL = int(os.environ.get("SUGGEST_INDEX_TTL", 60))
+
+# How long (seconds) a barcode scan lookup stays cached. Entries are also
+# dropped whenever the product or its stock changes.
+BARCODE_CACHE_TTL = int(os.environ.get("BARCODE_CACHE_TTL", 24 * 60 * 60))
+
+# Live stock stream (pos.stockstream, served by mini_pos/asgi.py). The
+# default backend only reaches tills connected to the same process; use
+# "pos.stockstream.PostgresBackend" when running several workers on
+# PostgreSQL. Heartbeat is in seconds; the queue caps events buffered for a
+# slow client before its stream is closed.
+STOCK_STREAM_BACKEND = os.environ.get(
+    "STOCK_STREAM_BACKEND", "pos.stockstream.LocalBackend"
+)
+STOCK_STREAM_HEARTBEAT = int(os.environ.get("STOCK_STREAM_HEARTBEAT", 15))
+STOCK_STREAM_QUEUE = int(os.environ.get("STOCK_STREAM_QUEUE", 1000))
 
 # Authentication settings
 LOGIN_URL = "login"
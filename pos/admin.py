@@ -1,4 +1,6 @@
+from io import BytesIO
 from django.contrib import admin
+from django.http import HttpResponse
 from .models import (
     Product,
     Customer,
@@ -8,7 +10,16 @@ from .models import (
     Supplier,
     PurchaseOrder,
     PurchaseOrderItem,
+    IdempotencyKey,
+    DailySales,
+    ExportJob,
+    HourlySales,
+    DailyCategorySales,
+    DailyProductSales,
+    TopSellerSnapshot,
+    ApiKey,
 )
+from .receipts import receipt_orders, write_receipt_bundle
 
 
 @admin.register(Category)
@@ -45,6 +56,15 @@ class OrderItemInline(admin.TabularInline):
 class OrderAdmin(admin.ModelAdmin):
     list_display = ("id", "customer", "total_price", "created_at")
     inlines = [OrderItemInline]
+    actions = ["download_receipts"]
+
+    @admin.action(description="Download receipts (zip)")
+    def download_receipts(self, request, queryset):
+        buffer = BytesIO()
+        write_receipt_bundle(receipt_orders(queryset.order_by("created_at")), buffer)
+        response = HttpResponse(buffer.getvalue(), content_type="application/zip")
+        response["Content-Disposition"] = 'attachment; filename="receipts.zip"'
+        return response
 
 
 class PurchaseOrderItemInline(admin.TabularInline):
@@ -65,3 +85,54 @@ class PurchaseOrderAdmin(admin.ModelAdmin):
     list_filter = ("status",)
     search_fields = ("order_number", "supplier__name")
     inlines = [PurchaseOrderItemInline]
+
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    list_display = ("key", "order", "created_at")
+    search_fields = ("key",)
+
+
+@admin.register(DailySales)
+class DailySalesAdmin(admin.ModelAdmin):
+    list_display = ("date", "order_count", "revenue")
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "format", "status", "requested_by", "created_at")
+    list_filter = ("status", "format")
+
+
+@admin.register(HourlySales)
+class HourlySalesAdmin(admin.ModelAdmin):
+    list_display = ("date", "hour", "order_count", "revenue")
+
+
+@admin.register(DailyCategorySales)
+class DailyCategorySalesAdmin(admin.ModelAdmin):
+    list_display = ("date", "category", "quantity", "revenue")
+
+
+@admin.register(DailyProductSales)
+class DailyProductSalesAdmin(admin.ModelAdmin):
+    list_display = ("date", "product", "quantity", "revenue")
+
+
+@admin.register(TopSellerSnapshot)
+class TopSellerSnapshotAdmin(admin.ModelAdmin):
+    list_display = ("scope", "period", "updated_at")
+    list_filter = ("scope",)
+
+
+@admin.register(ApiKey)
+class ApiKeyAdmin(admin.ModelAdmin):
+    # Keys are created with ``manage.py create_api_key`` (the raw key is
+    # only shown there); here they can be renamed, limited or revoked.
+    list_display = ("name", "prefix", "scopes", "rate", "burst", "is_active", "created_at")
+    list_filter = ("is_active",)
+    search_fields = ("name", "prefix")
+    readonly_fields = ("prefix", "created_at")
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,171 @@
+"""API key checks with per-key token-bucket rate limits.
+
+Every terminal gets its own ``ApiKey`` (``manage.py create_api_key``).
+Active keys are held in a per-process ``KeyStore`` indexed by prefix and
+reloaded after API_KEY_CACHE_TTL seconds, or straight away when a key is
+saved in this process, so checking a request needs no query. The presented
+key is hashed and compared with ``hmac.compare_digest``.
+
+Each key also has a ``TokenBucket`` (``rate`` per second, up to ``burst``)
+that is drawn from before the view runs. A noisy terminal gets ``429 Too
+Many Requests`` with ``Retry-After`` instead of reaching the ORM. Buckets
+are per process: with N workers a key can get up to N times its rate.
+
+The shared settings.API_KEY, if set, still works as a read/write key so
+existing tills keep running; clear MINI_POS_API_KEY once they have their
+own keys.
+"""
+
+import hashlib
+import hmac
+import math
+import secrets
+import threading
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.http import HttpResponse, HttpResponseForbidden
+from .models import ApiKey
+
+PREFIX_LENGTH = 8
+
+
+def hash_key(raw):
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def generate():
+    """A new random key and its ``(prefix, hash)`` for storage."""
+    raw = secrets.token_urlsafe(32)
+    return raw, raw[:PREFIX_LENGTH], hash_key(raw)
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self):
+        """Spend one token. Returns 0, or the seconds until one is available."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            # A zero rate only ever allows the burst; ask for a minute then.
+            return (1 - self.tokens) / self.rate if self.rate > 0 else 60.0
+
+
+class Key:
+    """What a request is authenticated as; set on ``request.api_key``."""
+
+    def __init__(self, ident, name, key_hash, scopes, bucket):
+        self.id = ident
+        self.name = name
+        self.key_hash = key_hash
+        self.scopes = scopes
+        self.bucket = bucket
+
+
+class KeyStore:
+    def __init__(self):
+        self._by_prefix = None
+        self._buckets = {}
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def stale(self):
+        return (
+            self._by_prefix is None
+            or time.monotonic() - self._loaded_at > settings.API_KEY_CACHE_TTL
+        )
+
+    def _bucket(self, ident, rate, burst):
+        # Keep a key's bucket across reloads unless its limits changed.
+        bucket = self._buckets.get(ident)
+        if bucket is None or (bucket.rate, bucket.burst) != (rate, burst):
+            bucket = TokenBucket(rate, burst)
+        return bucket
+
+    def reload(self):
+        by_prefix = {}
+        buckets = {}
+        for row in ApiKey.objects.filter(is_active=True):
+            bucket = buckets[row.pk] = self._bucket(row.pk, row.rate, row.burst)
+            key = Key(row.pk, row.name, row.key_hash, row.scope_set(), bucket)
+            by_prefix.setdefault(row.prefix, []).append(key)
+        if settings.API_KEY:
+            ident = "settings"
+            bucket = buckets[ident] = self._bucket(
+                ident, settings.API_KEY_RATE, settings.API_KEY_BURST
+            )
+            legacy = Key(
+                ident,
+                "settings.API_KEY",
+                hash_key(settings.API_KEY),
+                frozenset({ApiKey.SCOPE_READ, ApiKey.SCOPE_WRITE}),
+                bucket,
+            )
+            by_prefix.setdefault(settings.API_KEY[:PREFIX_LENGTH], []).append(legacy)
+        with self._lock:
+            self._by_prefix = by_prefix
+            self._buckets = buckets
+            self._loaded_at = time.monotonic()
+
+    def match(self, raw):
+        """The ``Key`` for a presented key string, or None."""
+        if not raw:
+            return None
+        digest = hash_key(raw)
+        for key in self._by_prefix.get(raw[:PREFIX_LENGTH], ()):
+            if hmac.compare_digest(digest, key.key_hash):
+                return key
+        return None
+
+    def invalidate(self, **kwargs):
+        # Keep serving the old keys until the next check reloads them.
+        self._loaded_at = -math.inf
+
+
+store = KeyStore()
+
+
+def authenticate(raw):
+    if store.stale():
+        store.reload()
+    return store.match(raw)
+
+
+async def aauthenticate(raw):
+    if store.stale():
+        await sync_to_async(store.reload)()
+    return store.match(raw)
+
+
+def presented_key(request):
+    # Check X-API-KEY header (also accept HTTP_X_API_KEY for older servers)
+    return request.headers.get("X-API-KEY") or request.META.get("HTTP_X_API_KEY")
+
+
+def verdict(key, scope):
+    """None if ``key`` may make a ``scope`` request now, else the response."""
+    if key is None:
+        return HttpResponseForbidden("Invalid or missing API key")
+    if scope not in key.scopes:
+        return HttpResponseForbidden(f"API key lacks the '{scope}' scope")
+    wait = key.bucket.take()
+    if wait:
+        response = HttpResponse("Too many requests", status=429)
+        response["Retry-After"] = str(max(1, math.ceil(wait)))
+        return response
+    return None
+
+
+post_save.connect(store.invalidate, sender=ApiKey, dispatch_uid="pos.apikeys.save")
+post_delete.connect(store.invalidate, sender=ApiKey, dispatch_uid="pos.apikeys.delete")
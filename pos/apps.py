@@ -1,6 +1,27 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class PosConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "pos"
+
+    def ready(self):
+        # Register the model signals: Product changes invalidate the
+        # autocomplete index and barcode cache and feed the change sequence
+        # and live stock stream; ApiKey changes refresh the key cache; deleted
+        # orders are taken back out of the sales rollups and columnar store.
+        from . import (  # noqa: F401
+            apikeys,
+            barcodes,
+            changefeed,
+            columnar,
+            rollups,
+            stockstream,
+            suggest,
+        )
+        from .search import ensure_after_migrate
+
+        # SQLite migrations that copy an indexed table drop its FTS triggers;
+        # put them back after every migrate.
+        post_migrate.connect(ensure_after_migrate, sender=self)
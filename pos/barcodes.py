@@ -0,0 +1,70 @@
+"""Barcode scan lookups served from Django's cache.
+
+A scanner burst asks for the same few products over and over, so each
+``barcode -> product`` answer is cached under ``pos:barcode:<code>`` until
+the product changes. ``Product`` save/delete signals drop the entry (also
+the old code when a barcode is edited) and checkout drops the entries of
+the products whose stock it just changed, since that is a queryset
+``UPDATE`` that sends no signal.
+
+The default cache is per process; point CACHES at Redis or Memcached to
+share entries and invalidations between web workers.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save, pre_save
+from .models import Product
+
+# v2: prices are cached as decimal strings.
+CACHE_PREFIX = "pos:barcode:v2:"
+
+
+def _key(code):
+    return CACHE_PREFIX + code
+
+
+def _entry(product):
+    return {
+        "id": product.pk,
+        "barcode": product.barcode,
+        "name": product.name,
+        "price": str(product.price),
+        "stock": product.stock,
+    }
+
+
+def lookup(code):
+    """Product data for ``code``, or None if no product has that barcode."""
+    key = _key(code)
+    entry = cache.get(key)
+    if entry is None:
+        product = Product.objects.filter(barcode=code).first()
+        if product is None:
+            return None
+        entry = _entry(product)
+        cache.set(key, entry, settings.BARCODE_CACHE_TTL)
+    return entry
+
+
+def invalidate(*codes):
+    cache.delete_many([_key(code) for code in codes if code])
+
+
+def _remember_old_barcode(sender, instance, **kwargs):
+    instance._old_barcode = (
+        Product.objects.filter(pk=instance.pk).values_list("barcode", flat=True).first()
+        if instance.pk
+        else None
+    )
+
+
+def _product_changed(sender, instance, **kwargs):
+    invalidate(instance.barcode, getattr(instance, "_old_barcode", None))
+
+
+pre_save.connect(_remember_old_barcode, sender=Product, dispatch_uid="pos.barcodes.pre")
+post_save.connect(_product_changed, sender=Product, dispatch_uid="pos.barcodes.save")
+post_delete.connect(
+    _product_changed, sender=Product, dispatch_uid="pos.barcodes.delete"
+)
@@ -0,0 +1,121 @@
+"""Change sequence for the product catalog, used by till delta sync.
+
+Every insert, update or delete of a product appends a ``ProductChange``
+row; its auto-increment id is the change sequence and is also stored on
+``Product.change_seq``. ``product_id`` is unique and ``allocate`` upserts,
+moving a product's row to a fresh id, so the table holds one row per
+product (a tombstone for deleted ones) and ``changes_since(seq)`` is a
+single index range scan.
+
+``Product`` save/delete signals cover the admin, forms, Excel import and
+purchase order receiving. Checkout reserves stock with a queryset
+``UPDATE`` that sends no signal, so it calls ``allocate`` itself.
+
+Sequence numbers are handed out at insert time, not at commit. SQLite
+serialises writers, so commit order matches; on PostgreSQL a slow
+transaction can commit a lower number after a till has already read past
+it, and that change is then only picked up with the product's next one.
+"""
+
+from django.db import connection
+from django.db.models import Max
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+from .models import Product, ProductChange
+
+PRODUCT_FIELDS = ("id", "name", "barcode", "category_id", "price", "stock", "description")
+
+
+def allocate(product_ids, deleted=False):
+    """Append a change for each product and return ``{product_id: seq}``.
+
+    The caller stores the sequence on the product row (``record`` does it
+    for saves; checkout folds it into its stock ``UPDATE``).
+
+    One ``INSERT ... ON CONFLICT (product_id) DO UPDATE`` statement: an
+    existing row takes the id the insert just drew, so concurrent writers
+    of the same product serialise on that row instead of racing a
+    DELETE + INSERT. Raw SQL because ``bulk_create`` can neither update the
+    primary key nor return it on conflict.
+    """
+    product_ids = sorted(set(product_ids))
+    if not product_ids:
+        return {}
+    table = ProductChange._meta.db_table
+    values = ", ".join(["(%s, %s)"] * len(product_ids))
+    params = [v for pid in product_ids for v in (pid, deleted)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (product_id, deleted) VALUES {values} "
+            "ON CONFLICT (product_id) DO UPDATE "
+            "SET id = EXCLUDED.id, deleted = EXCLUDED.deleted "
+            "RETURNING product_id, id",
+            params,
+        )
+        return dict(cursor.fetchall())
+
+
+def record(product_ids, deleted=False):
+    """Allocate sequence numbers and stamp them on the product rows."""
+    seqs = allocate(product_ids, deleted=deleted)
+    if not deleted:
+        now = timezone.now()
+        for pid, seq in seqs.items():
+            Product.objects.filter(pk=pid).update(change_seq=seq, updated_at=now)
+    return seqs
+
+
+def latest_seq():
+    """Sequence number of the newest catalog change (0 for none)."""
+    return ProductChange.objects.aggregate(seq=Max("pk"))["seq"] or 0
+
+
+async def alatest_seq():
+    return (await ProductChange.objects.aaggregate(seq=Max("pk")))["seq"] or 0
+
+
+def changes_since(since, limit=500):
+    """Changes with a sequence above ``since``, oldest first.
+
+    Returns ``(changes, next_since, has_more)``. Each change is a dict with
+    ``seq``, ``id`` and ``deleted``; live products also carry their fields.
+    """
+    rows = list(
+        ProductChange.objects.filter(pk__gt=since)
+        .order_by("pk")
+        .values_list("pk", "product_id", "deleted")[: limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    live = {
+        row["id"]: row
+        for row in Product.objects.filter(
+            pk__in=[pid for _, pid, deleted in rows if not deleted]
+        ).values(*PRODUCT_FIELDS, "updated_at")
+    }
+
+    changes = []
+    for seq, pid, deleted in rows:
+        if deleted:
+            changes.append({"seq": seq, "id": pid, "deleted": True})
+        elif pid in live:
+            # A product deleted since this read has a later tombstone
+            changes.append({"seq": seq, "deleted": False, **live[pid]})
+    next_since = rows[-1][0] if rows else since
+    return changes, next_since, has_more
+
+
+def _product_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        seq = record([instance.pk])[instance.pk]
+        instance.change_seq = seq
+
+
+def _product_deleted(sender, instance, **kwargs):
+    instance.change_seq = record([instance.pk], deleted=True)[instance.pk]
+
+
+post_save.connect(_product_saved, sender=Product, dispatch_uid="pos.changefeed.save")
+post_delete.connect(
+    _product_deleted, sender=Product, dispatch_uid="pos.changefeed.delete"
+)
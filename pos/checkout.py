@@ -0,0 +1,268 @@
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from . import barcodes, changefeed, stockstream
+from .models import Product, Customer, Order, OrderItem
+from .rollups import record_orders
+from .topk import best_sellers
+
+
+class CheckoutError(Exception):
+    """Base error for a basket that cannot be turned into an order."""
+
+
+class UnknownProduct(CheckoutError):
+    """Raised when a basket references product ids that do not exist."""
+
+    def __init__(self, product_ids):
+        self.product_ids = list(product_ids)
+        super().__init__(f"Unknown product(s): {self.product_ids}")
+
+
+class InsufficientStock(CheckoutError):
+    """Raised when at least one product cannot cover the requested quantity.
+
+    ``shortages`` is a list of ``(product, requested, available)`` tuples.
+    """
+
+    def __init__(self, shortages):
+        self.shortages = shortages
+        names = ", ".join(prod.name for prod, _, _ in shortages)
+        super().__init__(f"Insufficient stock for product: {names}")
+
+
+def _prepare(lines, products=None):
+    """Normalise basket ``lines`` and price them.
+
+    Returns ``(lines, wanted, total, products)`` where ``wanted`` maps
+    product id to the total quantity. Raises ``CheckoutError`` or
+    ``UnknownProduct`` without touching the database when ``products`` is
+    given.
+    """
+    lines = [(int(pid), int(qty), Decimal(disc or 0)) for pid, qty, disc in lines]
+    if not lines:
+        raise CheckoutError("No valid items")
+
+    wanted = {}
+    for pid, qty, _ in lines:
+        wanted[pid] = wanted.get(pid, 0) + qty
+
+    if products is None:
+        products = Product.objects.in_bulk(list(wanted))
+    missing = [pid for pid in wanted if pid not in products]
+    if missing:
+        raise UnknownProduct(missing)
+
+    total = Decimal("0")
+    for pid, qty, discount in lines:
+        subtotal = products[pid].price * qty
+        total += subtotal - subtotal * (discount / 100)
+    return lines, wanted, total, products
+
+
+def _reserve(wanted, seqs):
+    """Take ``wanted`` units off stock, all or nothing.
+
+    Reserves in primary-key order so concurrent baskets lock rows in the
+    same sequence and cannot deadlock each other. Returns the
+    ``(product_id, quantity)`` pairs that were short; when there are any,
+    the reservations that did succeed are rolled back.
+    """
+    shortages = []
+    now = timezone.now()
+    with transaction.atomic():
+        for pid in sorted(wanted):
+            qty = wanted[pid]
+            reserved = Product.objects.filter(pk=pid, stock__gte=qty).update(
+                stock=F("stock") - qty, change_seq=seqs[pid], updated_at=now
+            )
+            if not reserved:
+                shortages.append((pid, qty))
+        if shortages:
+            transaction.set_rollback(True)
+    return shortages
+
+
+def _create_orders(baskets, products, wanted, seqs):
+    """Write the orders of already reserved ``baskets`` and announce them.
+
+    ``baskets`` is a list of ``(customer, lines, total)``; ``wanted`` covers
+    every product in them. Orders and lines are inserted with one
+    ``bulk_create`` each and the rollups are updated once. Returns the
+    orders and the new stock level per product.
+    """
+    orders = Order.objects.bulk_create(
+        [Order(customer=customer, total_price=total) for customer, _, total in baskets]
+    )
+    items = OrderItem.objects.bulk_create(
+        [
+            OrderItem(
+                order=order,
+                product=products[pid],
+                quantity=qty,
+                price=products[pid].price,
+                discount_percent=discount,
+            )
+            for order, (_, lines, _) in zip(orders, baskets)
+            for pid, qty, discount in lines
+        ]
+    )
+    lines_of = {order.pk: [] for order in orders}
+    for item in items:
+        lines_of[item.order_id].append(item)
+    pairs = [(order, lines_of[order.pk]) for order in orders]
+
+    record_orders(pairs)
+
+    def count_best_sellers():
+        for order, lines in pairs:
+            best_sellers.record(order, lines)
+
+    transaction.on_commit(count_best_sellers)
+    # Stock changed without a save() signal, so drop cached scan lookups
+    codes = [products[pid].barcode for pid in wanted if products[pid].barcode]
+    if codes:
+        transaction.on_commit(lambda: barcodes.invalidate(*codes))
+    stock = dict(Product.objects.filter(pk__in=list(wanted)).values_list("pk", "stock"))
+    # Push the new stock levels to tills on the live stream
+    stockstream.publish_stock([(pid, stock[pid], seqs[pid]) for pid in wanted])
+    return orders, stock
+
+
+def place_order(customer, lines, products=None):
+    """Create an order for ``customer`` and reserve stock atomically.
+
+    ``lines`` is an iterable of ``(product_id, quantity, discount_percent)``.
+    Stock is reserved with one conditional ``UPDATE ... WHERE stock >= n``
+    per product, so two tills can never sell the same last unit. If any
+    product is short, nothing is written and ``InsufficientStock`` is raised.
+
+    ``products`` may be a pre-fetched ``{id: Product}`` map (used by batch
+    ingestion); otherwise the products are loaded with one query.
+
+    Returns ``(order, out_of_stock_names)``.
+    """
+    lines, wanted, total, products = _prepare(lines, products)
+
+    with transaction.atomic():
+        # Stock is part of the till catalog feed, so bump the change sequence
+        seqs = changefeed.allocate(wanted)
+        shortages = _reserve(wanted, seqs)
+        if shortages:
+            available = dict(
+                Product.objects.filter(
+                    pk__in=[pid for pid, _ in shortages]
+                ).values_list("pk", "stock")
+            )
+            # Raising inside atomic() rolls back the change sequence too,
+            # so the basket is rejected as a whole.
+            raise InsufficientStock(
+                [(products[pid], qty, available.get(pid, 0)) for pid, qty in shortages]
+            )
+
+        (order,), stock = _create_orders(
+            [(customer, lines, total)], products, wanted, seqs
+        )
+        out_of_stock = [products[pid].name for pid in wanted if stock[pid] == 0]
+
+    return order, out_of_stock
+
+
+def place_order_batch(baskets, chunk_size=100):
+    """Place many baskets at once, e.g. a till flushing its offline queue.
+
+    ``baskets`` is a list of ``(customer_id, lines)`` where ``lines`` has the
+    same shape as for ``place_order``. Every customer and product referenced
+    by the batch is loaded with one query each. Each chunk of ``chunk_size``
+    baskets is one transaction that allocates change sequences once, takes
+    the summed quantities off stock with one conditional ``UPDATE`` per
+    product, and inserts all orders and all lines with one ``bulk_create``
+    each.
+
+    When the chunk as a whole is short of a product, the baskets that still
+    fit the current stock (in input order) are placed together and the rest
+    go through ``place_order`` one by one, each in its own savepoint, so a
+    rejected basket does not roll back its neighbours.
+
+    Returns one ``(order, error)`` pair per basket, in input order. Exactly
+    one of the two is ``None``.
+    """
+    customer_ids = {cid for cid, _ in baskets}
+    product_ids = {int(pid) for _, lines in baskets for pid, _, _ in lines}
+    customers = Customer.objects.in_bulk(list(customer_ids))
+    products = Product.objects.in_bulk(list(product_ids))
+
+    results = [None] * len(baskets)
+    for start in range(0, len(baskets), chunk_size):
+        prepared = []
+        for idx in range(start, min(start + chunk_size, len(baskets))):
+            customer_id, lines = baskets[idx]
+            customer = customers.get(customer_id)
+            if customer is None:
+                results[idx] = (None, CheckoutError("Unknown customer"))
+                continue
+            try:
+                lines, wanted, total, _ = _prepare(lines, products)
+            except CheckoutError as exc:
+                results[idx] = (None, exc)
+            else:
+                prepared.append((idx, customer, lines, wanted, total))
+        with transaction.atomic():
+            for idx, order in _place_chunk(prepared, products):
+                results[idx] = (order, None)
+            for idx, customer, lines, _, _ in prepared:
+                if results[idx] is not None:
+                    continue
+                try:
+                    order, _ = place_order(customer, lines, products=products)
+                except CheckoutError as exc:
+                    results[idx] = (None, exc)
+                else:
+                    results[idx] = (order, None)
+    return results
+
+
+def _place_chunk(prepared, products):
+    """Place as many ``prepared`` baskets as stock allows in one go.
+
+    Returns ``(index, order)`` for the baskets placed; the others are left
+    for ``place_order_batch`` to retry one by one.
+    """
+    if not prepared:
+        return []
+    seqs = changefeed.allocate({pid for *_, wanted, _ in prepared for pid in wanted})
+    accepted = prepared
+    totals = _sum_wanted(accepted)
+    if _reserve(totals, seqs):
+        # Keep the baskets that fit the stock as it is now, in input order.
+        remaining = dict(
+            Product.objects.filter(pk__in=list(totals)).values_list("pk", "stock")
+        )
+        accepted = []
+        for basket in prepared:
+            wanted = basket[3]
+            if all(remaining[pid] >= qty for pid, qty in wanted.items()):
+                for pid, qty in wanted.items():
+                    remaining[pid] -= qty
+                accepted.append(basket)
+        totals = _sum_wanted(accepted)
+        if not accepted or _reserve(totals, seqs):
+            # Stock moved under us; let place_order sort each basket out.
+            return []
+
+    orders, _ = _create_orders(
+        [(customer, lines, total) for _, customer, lines, _, total in accepted],
+        products,
+        totals,
+        seqs,
+    )
+    return [(basket[0], order) for basket, order in zip(accepted, orders)]
+
+
+def _sum_wanted(prepared):
+    totals = {}
+    for *_, wanted, _ in prepared:
+        for pid, qty in wanted.items():
+            totals[pid] = totals.get(pid, 0) + qty
+    return totals
@@ -0,0 +1,321 @@
+"""In-process columnar copy of order lines for ad-hoc analytics.
+
+``ColumnStore`` keeps every ``OrderItem`` as a set of NumPy arrays (one
+array per column) and answers group-bys with ``np.bincount`` instead of SQL
+aggregates. Loading is incremental: each ``refresh()`` only reads lines
+with an id above the last one seen, so after the first load a page view
+costs one small query plus a few vectorised passes over memory.
+
+Order lines are never edited after checkout. Orders are only deleted along
+with their customer; an ``Order`` ``post_delete`` receiver marks the store
+stale and the next ``get_store()`` reloads it from scratch. Deletes made by
+another process are not seen until this one restarts.
+
+NumPy is optional; ``available()`` tells whether this backend can be used.
+"""
+
+import threading
+from datetime import date, datetime, timezone as dt_timezone
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.utils import timezone
+from .models import Order, OrderItem, Product
+
+# Rows fetched per database round trip while loading.
+LOAD_CHUNK = 50_000
+
+# A line with a lower id can commit after a higher one (checkout runs in a
+# transaction), so each refresh re-reads this many ids below the high-water
+# mark and drops the ones already loaded.
+REFRESH_OVERLAP = 1000
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+WEEKDAY_LABELS = ["Sen", "Sel", "Rab", "Kam", "Jum", "Sab", "Min"]
+
+# Discount buckets for ``discount_effect``: (label, low, high), high exclusive.
+DISCOUNT_BUCKETS = [
+    ("0%", 0, 0.01),
+    ("1-5%", 0.01, 5.01),
+    ("6-10%", 5.01, 10.01),
+    ("11-20%", 10.01, 20.01),
+    ("> 20%", 20.01, 101),
+]
+
+COLUMNS = {
+    "id": "int64",
+    "order_id": "int64",
+    "product_id": "int64",
+    "quantity": "int64",
+    "price": "float64",
+    "discount": "float64",
+    "revenue": "float64",
+    "day": "int32",  # local date as a proleptic ordinal
+    "hour": "int8",  # local hour of the order
+    "weekday": "int8",  # Monday = 0
+}
+
+
+def available():
+    return np is not None
+
+
+class ColumnStore:
+    """Columnar snapshot of ``OrderItem`` joined with its order's timestamp."""
+
+    def __init__(self):
+        if np is None:
+            raise RuntimeError("The columnar analytics backend requires numpy")
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.columns = {
+                name: np.empty(0, dtype) for name, dtype in COLUMNS.items()
+            }
+            self.high_water = 0
+
+    def __len__(self):
+        return len(self.columns["id"])
+
+    def refresh(self):
+        """Load lines added since the last refresh. Returns how many were added."""
+        with self._lock:
+            since = max(self.high_water - REFRESH_OVERLAP, 0)
+            rows = (
+                OrderItem.objects.filter(id__gt=since)
+                .order_by("id")
+                .values_list(
+                    "id",
+                    "order_id",
+                    "product_id",
+                    "quantity",
+                    "price",
+                    "discount_percent",
+                    "order__created_at",
+                )
+                .iterator(chunk_size=LOAD_CHUNK)
+            )
+            loaded = self.columns["id"]
+            seen = loaded[loaded > since]
+            added = 0
+            chunk = []
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) == LOAD_CHUNK:
+                    added += self._append(chunk, seen)
+                    chunk = []
+            if chunk:
+                added += self._append(chunk, seen)
+            return added
+
+    def _append(self, rows, seen):
+        ids, order_ids, product_ids, quantities, prices, discounts, created = zip(
+            *rows
+        )
+        new = {
+            "id": np.array(ids, dtype="int64"),
+            "order_id": np.array(order_ids, dtype="int64"),
+            "product_id": np.array(product_ids, dtype="int64"),
+            "quantity": np.array(quantities, dtype="int64"),
+            "price": np.array(prices, dtype="float64"),
+            "discount": np.array(discounts, dtype="float64"),
+        }
+        new["revenue"] = new["quantity"] * new["price"] * (1 - new["discount"] / 100)
+        new["day"], new["hour"], new["weekday"] = _local_calendar(created)
+
+        keep = ~np.isin(new["id"], seen) if len(seen) else None
+        if keep is not None:
+            new = {name: values[keep] for name, values in new.items()}
+        if not len(new["id"]):
+            return 0
+        # Build new arrays instead of growing in place so readers holding
+        # the old ones are never affected.
+        self.columns = {
+            name: np.concatenate([self.columns[name], new[name].astype(dtype)])
+            for name, dtype in COLUMNS.items()
+        }
+        self.high_water = max(self.high_water, int(new["id"].max()))
+        return len(new["id"])
+
+    # Queries take an optional inclusive local date window and read one
+    # consistent snapshot of the columns.
+
+    def window(self, start_date=None, end_date=None):
+        """Return ``(columns, mask)`` for lines of orders placed in the window."""
+        cols = self.columns
+        mask = np.ones(len(cols["id"]), dtype=bool)
+        if start_date:
+            mask &= cols["day"] >= start_date.toordinal()
+        if end_date:
+            mask &= cols["day"] <= end_date.toordinal()
+        return cols, mask
+
+    def top_products(self, start_date=None, end_date=None, n=5):
+        """``[(product_id, quantity, revenue)]`` with the highest revenue."""
+        cols, mask = self.window(start_date, end_date)
+        product_ids = cols["product_id"][mask]
+        if not len(product_ids):
+            return []
+        revenue = np.bincount(product_ids, weights=cols["revenue"][mask])
+        quantity = np.bincount(product_ids, weights=cols["quantity"][mask])
+        top = _top_n(revenue, n)
+        return [(int(pid), int(quantity[pid]), float(revenue[pid])) for pid in top]
+
+    def top_categories(self, start_date=None, end_date=None, n=5):
+        """``[(category_id, revenue)]`` with the highest revenue.
+
+        Categories are looked up from the current catalog, so a product that
+        moved category counts towards its new one.
+        """
+        cols, mask = self.window(start_date, end_date)
+        product_ids = cols["product_id"][mask]
+        if not len(product_ids):
+            return []
+        category_of = np.full(int(product_ids.max()) + 1, -1, dtype="int64")
+        for pid, cid in Product.objects.filter(category__isnull=False).values_list(
+            "id", "category_id"
+        ):
+            if pid < len(category_of):
+                category_of[pid] = cid
+        categories = category_of[product_ids]
+        has_category = categories >= 0
+        if not has_category.any():
+            return []
+        revenue = np.bincount(
+            categories[has_category], weights=cols["revenue"][mask][has_category]
+        )
+        return [(int(cid), float(revenue[cid])) for cid in _top_n(revenue, n)]
+
+    def hourly(self, start_date=None, end_date=None):
+        """Revenue and order count per local hour of day (two lists of 24).
+
+        Only orders with at least one line are seen by this store.
+        """
+        cols, mask = self.window(start_date, end_date)
+        hours = cols["hour"][mask]
+        revenue = np.bincount(hours, weights=cols["revenue"][mask], minlength=24)
+        first_lines = _first_line_per_order(cols["order_id"][mask])
+        orders = np.bincount(hours[first_lines], minlength=24)
+        return revenue.tolist(), orders.tolist()
+
+    def heatmap(self, start_date=None, end_date=None):
+        """Revenue per weekday x hour as a 7 x 24 nested list (Monday first)."""
+        cols, mask = self.window(start_date, end_date)
+        cells = cols["weekday"][mask].astype("int64") * 24 + cols["hour"][mask]
+        revenue = np.bincount(cells, weights=cols["revenue"][mask], minlength=7 * 24)
+        return revenue.reshape(7, 24).tolist()
+
+    def basket_sizes(self, start_date=None, end_date=None, max_size=10):
+        """Number of orders by units bought; the last bucket is ``max_size``+."""
+        cols, mask = self.window(start_date, end_date)
+        order_ids = cols["order_id"][mask]
+        if not len(order_ids):
+            return [0] * max_size
+        _, order_index = np.unique(order_ids, return_inverse=True)
+        units = np.bincount(order_index, weights=cols["quantity"][mask])
+        units = np.clip(units.astype("int64"), 1, max_size)
+        return np.bincount(units - 1, minlength=max_size).tolist()
+
+    def discount_effect(self, start_date=None, end_date=None):
+        """Per discount bucket: lines, average units per line, revenue, discount given."""
+        cols, mask = self.window(start_date, end_date)
+        discount = cols["discount"][mask]
+        quantity = cols["quantity"][mask]
+        revenue = cols["revenue"][mask]
+        given = quantity * cols["price"][mask] - revenue
+        edges = [low for _, low, _ in DISCOUNT_BUCKETS] + [DISCOUNT_BUCKETS[-1][2]]
+        bucket = np.digitize(discount, edges[1:-1])
+        size = len(DISCOUNT_BUCKETS)
+        lines = np.bincount(bucket, minlength=size)
+        units = np.bincount(bucket, weights=quantity, minlength=size)
+        sales = np.bincount(bucket, weights=revenue, minlength=size)
+        discounts = np.bincount(bucket, weights=given, minlength=size)
+        return [
+            {
+                "label": label,
+                "lines": int(lines[i]),
+                "avg_quantity": float(units[i] / lines[i]) if lines[i] else 0.0,
+                "revenue": float(sales[i]),
+                "discount": float(discounts[i]),
+            }
+            for i, (label, _, _) in enumerate(DISCOUNT_BUCKETS)
+        ]
+
+
+def _top_n(totals, n):
+    """Indexes of the ``n`` largest non-zero entries, largest first."""
+    nonzero = np.flatnonzero(totals)
+    if len(nonzero) > n:
+        nonzero = nonzero[np.argpartition(totals[nonzero], -n)[-n:]]
+    return nonzero[np.argsort(-totals[nonzero], kind="stable")]
+
+
+def _first_line_per_order(order_ids):
+    """Index of one line per distinct order in ``order_ids``."""
+    _, first = np.unique(order_ids, return_index=True)
+    return first
+
+
+def _local_calendar(created):
+    """Local day ordinal, hour and weekday for aware datetimes ``created``."""
+    epoch = np.array([dt.timestamp() for dt in created], dtype="float64").astype(
+        "int64"
+    )
+    # The UTC offset only changes on hour boundaries, so it is computed once
+    # per distinct UTC hour rather than once per row.
+    tz = timezone.get_current_timezone()
+    utc_hours, index = np.unique(epoch // 3600, return_inverse=True)
+    offsets = np.array(
+        [
+            datetime.fromtimestamp(int(h) * 3600, dt_timezone.utc)
+            .astimezone(tz)
+            .utcoffset()
+            .total_seconds()
+            for h in utc_hours
+        ],
+        dtype="int64",
+    )
+    local = epoch + offsets[index.reshape(-1)]
+    day = local // 86400 + EPOCH_ORDINAL
+    hour = (local % 86400) // 3600
+    weekday = (day - 1) % 7
+    return day, hour, weekday
+
+
+_store = None
+_store_stale = False
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """The process-wide store, refreshed with any lines added since last use."""
+    global _store, _store_stale
+    with _store_lock:
+        if _store is None:
+            _store = ColumnStore()
+        elif _store_stale:
+            _store.reset()
+        _store_stale = False
+    _store.refresh()
+    return _store
+
+
+def _mark_stale():
+    global _store_stale
+    _store_stale = True
+
+
+def _order_deleted(sender, instance, **kwargs):
+    # After commit, so a reload cannot pick the lines up again before then.
+    transaction.on_commit(_mark_stale)
+
+
+post_delete.connect(_order_deleted, sender=Order, dispatch_uid="pos.columnar.delete")
@@ -0,0 +1,66 @@
+import csv
+import json
+from django.db.models import Count
+
+# Rows are yielded in batches of this many lines to keep per-chunk
+# overhead low without buffering the whole export.
+ROWS_PER_CHUNK = 500
+
+EXPORT_FIELDS = ["order_id", "created_at", "customer", "item_count", "total"]
+
+
+def export_rows(orders_qs):
+    """Yield ``(id, created_at, customer name, item count, total)`` tuples.
+
+    Reads from a server-side cursor; no model instances are built.
+    """
+    return (
+        orders_qs.annotate(item_count=Count("items"))
+        .values_list("id", "created_at", "customer__name", "item_count", "total_price")
+        .iterator(chunk_size=2000)
+    )
+
+
+class _Echo:
+    """File-like object whose ``write`` just returns the value written."""
+
+    def write(self, value):
+        return value
+
+
+def _chunked(lines):
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= ROWS_PER_CHUNK:
+            yield "".join(batch)
+            batch = []
+    if batch:
+        yield "".join(batch)
+
+
+def stream_csv(rows):
+    """Yield a CSV document (with header) for ``export_rows`` tuples."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    yield from _chunked(
+        writer.writerow([pk, created_at.isoformat(), customer, count, total])
+        for pk, created_at, customer, count, total in rows
+    )
+
+
+def stream_ndjson(rows):
+    """Yield one JSON object per line for ``export_rows`` tuples."""
+    yield from _chunked(
+        json.dumps(
+            {
+                "order_id": pk,
+                "created_at": created_at.isoformat(),
+                "customer": customer,
+                "item_count": count,
+                "total": str(total),
+            }
+        )
+        + "\n"
+        for pk, created_at, customer, count, total in rows
+    )
@@ -22,9 +22,12 @@ class CategoryForm(forms.ModelForm):
 class ProductForm(forms.ModelForm):
     class Meta:
         model = Product
-        fields = ["name", "category", "price", "stock", "description"]
+        fields = ["name", "barcode", "category", "price", "stock", "description"]
         widgets = {
             "name": forms.TextInput(attrs={"class": "form-control"}),
+            "barcode": forms.TextInput(
+                attrs={"class": "form-control", "autocomplete": "off"}
+            ),
             "category": forms.Select(attrs={"class": "form-control"}),
             "price": forms.NumberInput(attrs={"class": "form-control", "step": "0.01"}),
             "stock": forms.NumberInput(attrs={"class": "form-control"}),
@@ -0,0 +1,42 @@
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from .models import IdempotencyKey
+
+
+def _ttl():
+    return timedelta(seconds=getattr(settings, "IDEMPOTENCY_KEY_TTL", 24 * 60 * 60))
+
+
+def lookup(key):
+    """Return the order id recorded for ``key``, or ``None``.
+
+    Single indexed lookup on the unique key column; keys older than
+    ``IDEMPOTENCY_KEY_TTL`` seconds are treated as unknown.
+    """
+    return (
+        IdempotencyKey.objects.filter(key=key, created_at__gte=timezone.now() - _ttl())
+        .values_list("order_id", flat=True)
+        .first()
+    )
+
+
+def remember(key, order):
+    """Record that ``key`` produced ``order``.
+
+    Call inside the transaction that created the order. An expired entry
+    for the same key is replaced; a live one makes the insert fail with
+    ``IntegrityError`` (a concurrent retry won the race).
+    """
+    IdempotencyKey.objects.filter(
+        key=key, created_at__lt=timezone.now() - _ttl()
+    ).delete()
+    IdempotencyKey.objects.create(key=key, order=order)
+
+
+def prune():
+    """Delete every expired key. Returns the number of rows removed."""
+    deleted, _ = IdempotencyKey.objects.filter(
+        created_at__lt=timezone.now() - _ttl()
+    ).delete()
+    return deleted
@@ -0,0 +1,141 @@
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from urllib.parse import urlencode
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+from .models import ExportJob
+from .reporting import SalesReport
+from .utils import generate_report_excel, stream_report_pdf
+
+EXTENSIONS = {"pdf": "pdf", "excel": "xlsx"}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def request_export(fmt, report, user=None):
+    """Return ``(job, created)`` for exporting ``report`` as ``fmt``.
+
+    If an identical export (same format, same window, same day) is already
+    pending or running, that job is returned instead of queueing another.
+    """
+    fail_stale_jobs()
+    params = report.query_params()
+    dedupe_key = f"{fmt}:{report.today.isoformat()}:{urlencode(sorted(params.items()))}"
+
+    existing = ExportJob.objects.filter(
+        dedupe_key=dedupe_key, status__in=ExportJob.IN_FLIGHT
+    ).first()
+    if existing:
+        return existing, False
+    try:
+        with transaction.atomic():
+            job = ExportJob.objects.create(
+                format=fmt, params=params, dedupe_key=dedupe_key, requested_by=user
+            )
+    except IntegrityError:
+        # Someone queued the same export between our check and insert.
+        job = ExportJob.objects.get(
+            dedupe_key=dedupe_key, status__in=ExportJob.IN_FLIGHT
+        )
+        return job, False
+
+    if settings.EXPORT_WORKERS_IN_PROCESS:
+        transaction.on_commit(lambda: _submit(job.pk))
+    return job, True
+
+
+def fail_stale_jobs():
+    """Mark jobs stuck for longer than EXPORT_JOB_TIMEOUT as failed.
+
+    That covers jobs still running and jobs still pending: an in-process
+    worker that restarts loses its queue, and a job nobody picks up would
+    otherwise be handed back by the dedupe check for the rest of the day.
+    """
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=settings.EXPORT_JOB_TIMEOUT)
+    running = ExportJob.objects.filter(status="running", started_at__lt=cutoff).update(
+        status="failed", error="Timed out", finished_at=now
+    )
+    pending = ExportJob.objects.filter(status="pending", created_at__lt=cutoff).update(
+        status="failed", error="Never started", finished_at=now
+    )
+    return running + pending
+
+
+def export_path(job):
+    return settings.EXPORT_DIR / f"{job.pk}_{job.file_name}"
+
+
+def run_job(job_id):
+    """Claim and render one pending job. Returns False if it was already taken."""
+    claimed = ExportJob.objects.filter(pk=job_id, status="pending").update(
+        status="running", started_at=timezone.now()
+    )
+    if not claimed:
+        return False
+
+    job = ExportJob.objects.get(pk=job_id)
+    try:
+        report = SalesReport.from_params(job.params)
+        job.file_name = report.filename(EXTENSIONS[job.format])
+        os.makedirs(settings.EXPORT_DIR, exist_ok=True)
+        path = export_path(job)
+        with open(path, "wb") as out:
+            if job.format == "pdf":
+                for chunk in stream_report_pdf(
+                    report.period_start,
+                    report.end_date,
+                    report.iter_orders(),
+                    report.summary(),
+                ):
+                    out.write(chunk)
+            else:
+                with generate_report_excel(
+                    report.period_start,
+                    report.end_date,
+                    report.iter_orders(),
+                    report.summary(),
+                ) as excel_file:
+                    shutil.copyfileobj(excel_file, out)
+    except Exception as exc:
+        job.status = "failed"
+        job.error = str(exc)
+    else:
+        job.status = "done"
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "file_name", "error", "finished_at"])
+    return True
+
+
+def run_pending(limit=None):
+    """Run pending jobs oldest first in this thread. Returns how many ran."""
+    done = 0
+    for job_id in ExportJob.objects.filter(status="pending").order_by(
+        "created_at"
+    ).values_list("pk", flat=True)[:limit]:
+        if run_job(job_id):
+            done += 1
+    return done
+
+
+def _run_in_thread(job_id):
+    try:
+        run_job(job_id)
+    finally:
+        connection.close()
+
+
+def _submit(job_id):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.EXPORT_WORKERS_IN_PROCESS,
+                thread_name_prefix="export",
+            )
+    _executor.submit(_run_in_thread, job_id)
@@ -0,0 +1,180 @@
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the analytics group-bys as ORM .values().annotate() queries "
+        "against the NumPy columnar store. Use --seed to add synthetic lines "
+        "first (e.g. --seed 1000000); they are rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Insert this many synthetic order lines before benchmarking",
+        )
+        parser.add_argument(
+            "--days", type=int, default=365, help="Window to aggregate over"
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=3, help="Runs per query (best is reported)"
+        )
+
+    def handle(self, *args, **options):
+        from django.db import transaction
+
+        with transaction.atomic():
+            self._run(options)
+            # Never keep the synthetic orders: they bypass the rollups.
+            transaction.set_rollback(True)
+
+    def _run(self, options):
+        from django.db.models import F, Sum, Count
+        from django.utils import timezone
+        from pos import columnar
+        from pos.models import Order, OrderItem
+        from pos.timebuckets import day_bounds
+
+        if not columnar.available():
+            raise CommandError("numpy is not installed.")
+
+        if options["seed"]:
+            self._seed(options["seed"], options["days"])
+
+        end_date = timezone.localdate()
+        start_date = end_date - timedelta(days=options["days"])
+        start, end = day_bounds(start_date, end_date)
+        lines = OrderItem.objects.filter(
+            order__created_at__gte=start, order__created_at__lt=end
+        )
+        revenue = F("quantity") * F("price") * (1 - F("discount_percent") / 100)
+
+        orm = {
+            "top_products": lambda: list(
+                lines.values("product_id")
+                .annotate(qty=Sum("quantity"), total=Sum(revenue))
+                .order_by("-total")[:5]
+            ),
+            "top_categories": lambda: list(
+                lines.values("product__category_id")
+                .annotate(total=Sum(revenue))
+                .order_by("-total")[:5]
+            ),
+            "hourly": lambda: list(
+                Order.objects.filter(created_at__gte=start, created_at__lt=end)
+                .values(hour=F("created_at__hour"))
+                .annotate(total=Sum("total_price"), count=Count("id"))
+            ),
+            "heatmap": lambda: list(
+                lines.values(
+                    weekday=F("order__created_at__week_day"),
+                    hour=F("order__created_at__hour"),
+                ).annotate(total=Sum(revenue))
+            ),
+        }
+
+        started = time.perf_counter()
+        store = columnar.ColumnStore()
+        loaded = store.refresh()
+        load_time = time.perf_counter() - started
+        started = time.perf_counter()
+        store.refresh()
+        refresh_time = time.perf_counter() - started
+        arrays = sum(values.nbytes for values in store.columns.values())
+        self.stdout.write(
+            f"columnar load: {loaded:,} lines in {load_time:.2f}s "
+            f"({arrays / 2**20:.1f} MiB); empty refresh {refresh_time * 1000:.1f} ms"
+        )
+
+        numpy = {
+            "top_products": lambda: store.top_products(start_date, end_date),
+            "top_categories": lambda: store.top_categories(start_date, end_date),
+            "hourly": lambda: store.hourly(start_date, end_date),
+            "heatmap": lambda: store.heatmap(start_date, end_date),
+        }
+        for name in orm:
+            orm_time = self._best(orm[name], options["repeat"])
+            numpy_time = self._best(numpy[name], options["repeat"])
+            self.stdout.write(
+                f"{name:<15} orm={orm_time * 1000:9.1f} ms  "
+                f"numpy={numpy_time * 1000:8.1f} ms  "
+                f"x{orm_time / max(numpy_time, 1e-9):.1f}"
+            )
+
+    def _best(self, fn, repeat):
+        best = None
+        for _ in range(max(repeat, 1)):
+            started = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def _seed(self, n_lines, days):
+        from django.db import transaction
+        from django.utils import timezone
+        from pos.models import Customer, Order, OrderItem, Product
+
+        products = list(Product.objects.values_list("id", "price"))
+        if not products:
+            raise CommandError("Create some products first (e.g. generate_dummy).")
+
+        customer = Customer.objects.create(name="Benchmark Analytics")
+        now = timezone.now()
+        rng = random.Random(0)
+        batch = 10_000
+        written = 0
+        self.stdout.write(f"Seeding {n_lines:,} lines...")
+        while written < n_lines:
+            with transaction.atomic():
+                baskets = []
+                while written < n_lines and len(baskets) < batch:
+                    size = min(rng.randint(1, 5), n_lines - written)
+                    baskets.append(
+                        [
+                            (
+                                *rng.choice(products),
+                                rng.randint(1, 4),
+                                Decimal(rng.choice([0, 0, 0, 5, 10, 15, 25])),
+                            )
+                            for _ in range(size)
+                        ]
+                    )
+                    written += size
+                orders = Order.objects.bulk_create(
+                    [
+                        Order(customer=customer, total_price=Decimal("0"))
+                        for _ in baskets
+                    ]
+                )
+                # auto_now_add ignores created_at on insert, so spread the
+                # orders over the window with a second pass.
+                items = []
+                for order, basket in zip(orders, baskets):
+                    order.created_at = now - timedelta(
+                        seconds=rng.randint(0, days * 86400)
+                    )
+                    total = Decimal("0")
+                    for pid, price, qty, discount in basket:
+                        item = OrderItem(
+                            order=order,
+                            product_id=pid,
+                            quantity=qty,
+                            price=price,
+                            discount_percent=discount,
+                        )
+                        total += item.subtotal()
+                        items.append(item)
+                    order.total_price = total.quantize(Decimal("0.01"))
+                Order.objects.bulk_update(
+                    orders, ["created_at", "total_price"], batch_size=1000
+                )
+                OrderItem.objects.bulk_create(items, batch_size=5000)
+        self.stdout.write(f"Seeded {written:,} lines.")
+        return customer
@@ -0,0 +1,123 @@
+import json
+import random
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure GET /api/products/ latency at several catalog sizes: the old "
+        "JsonResponse path, the orjson path, gzip, 304 revalidation and an "
+        "idle delta-sync poll. Synthetic products are rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--products",
+            type=int,
+            nargs="+",
+            default=[10_000, 100_000],
+            help="Catalog sizes to benchmark (products are added up to each size)",
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=5, help="Runs per case (best is reported)"
+        )
+
+    def handle(self, *args, **options):
+        from django.db import transaction
+
+        with transaction.atomic():
+            auth = {"HTTP_X_API_KEY": self._key()}
+            for size in sorted(options["products"]):
+                self._fill(size)
+                self._bench(size, options["repeat"], auth)
+            # Never keep the synthetic catalog.
+            transaction.set_rollback(True)
+
+    def _key(self):
+        from pos import apikeys
+        from pos.models import ApiKey
+
+        # A key of its own (rolled back too), so the benchmark is never
+        # throttled by, or drains, the shared settings.API_KEY bucket.
+        raw, prefix, key_hash = apikeys.generate()
+        ApiKey.objects.create(
+            name="bench_api", prefix=prefix, key_hash=key_hash, rate=1e9, burst=10**9
+        )
+        return raw
+
+    def _fill(self, size):
+        from pos.models import Category, Product
+
+        missing = size - Product.objects.count()
+        if missing <= 0:
+            return
+        category, _ = Category.objects.get_or_create(name="Benchmark API")
+        rng = random.Random(size)
+        # bulk_create skips the change-feed signals, which is fine here:
+        # only the full listing reads these rows.
+        Product.objects.bulk_create(
+            (
+                Product(
+                    name=f"Produk Benchmark {i}",
+                    category=category,
+                    price=Decimal(rng.randint(500, 500_000)) / 100,
+                    stock=rng.randint(0, 500),
+                    description="Sintetis untuk bench_api",
+                )
+                for i in range(missing)
+            ),
+            batch_size=5000,
+        )
+
+    def _bench(self, size, repeat, auth):
+        from asgiref.sync import async_to_sync
+        from django.core.serializers.json import DjangoJSONEncoder
+        from django.test import RequestFactory
+        from pos import changefeed, views
+        from pos.models import Product
+
+        factory = RequestFactory()
+        # The views are async; run them the way a WSGI worker does.
+        api_products = async_to_sync(views.api_products)
+        api_product_changes = async_to_sync(views.api_product_changes)
+        since = changefeed.latest_seq()
+        etag = api_products(factory.get("/api/products/", **auth))["ETag"]
+
+        def legacy():
+            # What the endpoint did before: stdlib json + DjangoJSONEncoder.
+            data = list(Product.objects.values("id", "name", "price", "stock", "description"))
+            return json.dumps({"products": data}, cls=DjangoJSONEncoder).encode()
+
+        cases = {
+            "json (old)": legacy,
+            "orjson": lambda: api_products(
+                factory.get("/api/products/", **auth)
+            ),
+            "orjson+gzip": lambda: api_products(
+                factory.get("/api/products/", HTTP_ACCEPT_ENCODING="gzip", **auth)
+            ),
+            "304": lambda: api_products(
+                factory.get("/api/products/", HTTP_IF_NONE_MATCH=etag, **auth)
+            ),
+            "changes idle": lambda: api_product_changes(
+                factory.get(f"/api/products/changes/?since={since}", **auth)
+            ),
+        }
+        self.stdout.write(f"{size:,} products")
+        for name, fn in cases.items():
+            elapsed, result = self._best(fn, repeat)
+            body = result if isinstance(result, bytes) else result.content
+            self.stdout.write(
+                f"  {name:<13} {elapsed * 1000:9.1f} ms  {len(body):>12,} bytes"
+            )
+
+    def _best(self, fn, repeat):
+        best = None
+        for _ in range(max(repeat, 1)):
+            started = time.perf_counter()
+            result = fn()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
@@ -0,0 +1,53 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Compare receipt rendering cost: ReportLab PDF vs ESC/POS vs plain text"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--order", type=int, help="Order id to render (default: latest order)"
+        )
+        parser.add_argument(
+            "--iterations", type=int, default=200, help="Renders per renderer"
+        )
+
+    def handle(self, *args, **options):
+        from pos.models import Order
+        from pos.receipts import load_order
+        from pos.receipt_layout import (
+            build_receipt_layout,
+            render_receipt_escpos,
+            render_receipt_text,
+        )
+        from pos.utils import generate_receipt_pdf
+
+        pk = options["order"] or Order.objects.order_by("-pk").values_list(
+            "pk", flat=True
+        ).first()
+        if pk is None:
+            raise CommandError("No orders to render.")
+        order = load_order(pk)
+        lines = build_receipt_layout(order)
+        n = options["iterations"]
+
+        renderers = [
+            ("layout", lambda: build_receipt_layout(order)),
+            ("pdf", lambda: generate_receipt_pdf(order, lines)),
+            ("escpos", lambda: render_receipt_escpos(lines)),
+            ("text", lambda: render_receipt_text(lines)),
+        ]
+        results = {}
+        for name, render in renderers:
+            started = time.perf_counter()
+            for _ in range(n):
+                render()
+            results[name] = (time.perf_counter() - started) / n
+
+        self.stdout.write(f"Order #{pk}, {len(lines)} layout lines, {n} iterations")
+        for name, per_call in results.items():
+            self.stdout.write(
+                f"  {name:<7} {per_call * 1e6:10.1f} us/receipt  "
+                f"({results['pdf'] / per_call:8.1f}x vs pdf)"
+            )
@@ -0,0 +1,71 @@
+import time
+import tracemalloc
+from datetime import timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure peak memory of the report exporters for growing row counts. "
+        "Rows are synthetic, so only the export engine itself is measured."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            default="1000,10000,100000,1000000",
+            help="Comma separated row counts to benchmark",
+        )
+        parser.add_argument(
+            "--format",
+            choices=["excel", "pdf"],
+            default="excel",
+            help="Which exporter to benchmark",
+        )
+
+    def handle(self, *args, **options):
+        from pos.utils import generate_report_excel, stream_report_pdf
+
+        today = timezone.localdate()
+        now = timezone.now()
+        customer = SimpleNamespace(name="Pelanggan Benchmark")
+
+        def fake_orders(n):
+            for i in range(n):
+                yield SimpleNamespace(
+                    created_at=now - timedelta(seconds=i),
+                    customer=customer,
+                    total_price=Decimal(1000 + i % 5000),
+                )
+
+        # Warm-up run so lazy imports are not counted as export memory
+        for n in [1] + [int(v) for v in options["rows"].split(",")]:
+            summary = {
+                "total_orders": n,
+                "total_sales": Decimal(0),
+                "avg_sales": Decimal(0),
+            }
+            tracemalloc.start()
+            started = time.perf_counter()
+            size = 0
+            if options["format"] == "excel":
+                with generate_report_excel(
+                    today, today, fake_orders(n), summary
+                ) as excel_file:
+                    excel_file.seek(0, 2)
+                    size = excel_file.tell()
+            else:
+                for chunk in stream_report_pdf(today, today, fake_orders(n), summary):
+                    size += len(chunk)
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            if n == 1:
+                continue
+            self.stdout.write(
+                f"{options['format']} rows={n:>9,} peak={peak / 2**20:7.2f} MiB "
+                f"output={size / 2**20:8.2f} MiB time={elapsed:6.1f}s"
+            )
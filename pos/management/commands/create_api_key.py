@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Create an API key for one terminal or integration and print it once. "
+        "Only its hash is stored."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("name", help="Terminal / integration name, e.g. 'Kasir 1'")
+        parser.add_argument(
+            "--scopes",
+            default="read",
+            help="Comma-separated scopes: read (GET endpoints, stock stream), "
+            "write (create orders). Default: read",
+        )
+        parser.add_argument(
+            "--rate", type=float, default=5.0, help="Sustained requests per second"
+        )
+        parser.add_argument(
+            "--burst", type=int, default=20, help="Requests allowed in a burst"
+        )
+
+    def handle(self, *args, **options):
+        from pos import apikeys
+        from pos.models import ApiKey
+
+        known = {ApiKey.SCOPE_READ, ApiKey.SCOPE_WRITE}
+        scopes = [s.strip() for s in options["scopes"].split(",") if s.strip()]
+        unknown = set(scopes) - known
+        if not scopes or unknown:
+            raise CommandError(f"Unknown scope(s): {', '.join(sorted(unknown)) or '-'}")
+        if options["rate"] < 0 or options["burst"] < 1:
+            raise CommandError("--rate must be >= 0 and --burst >= 1")
+
+        raw, prefix, key_hash = apikeys.generate()
+        key = ApiKey.objects.create(
+            name=options["name"],
+            prefix=prefix,
+            key_hash=key_hash,
+            scopes=",".join(scopes),
+            rate=options["rate"],
+            burst=options["burst"],
+        )
+        self.stdout.write(f"Created API key #{key.pk} for {key.name} ({key.scopes})")
+        self.stdout.write("Send it as the X-API-KEY header; it is not shown again:")
+        self.stdout.write(raw)
@@ -0,0 +1,110 @@
+import http.client
+import threading
+import time
+from urllib.parse import urlsplit
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Open N concurrent keep-alive connections against one or more running "
+        "servers and report throughput and latency, e.g. gunicorn WSGI on "
+        ":8000 vs gunicorn+uvicorn ASGI on :8001 serving the same database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "urls",
+            nargs="+",
+            help="Full URLs to hit, e.g. http://127.0.0.1:8000/api/products/?limit=100",
+        )
+        parser.add_argument(
+            "--concurrency", type=int, default=100, help="Concurrent connections"
+        )
+        parser.add_argument(
+            "--duration", type=float, default=10.0, help="Seconds per URL"
+        )
+        parser.add_argument(
+            "--timeout", type=float, default=30.0, help="Per-request timeout"
+        )
+        parser.add_argument(
+            "--key",
+            default=settings.API_KEY,
+            help="API key to send; give it a rate limit above the load "
+            "(create_api_key --rate), or requests are answered with 429",
+        )
+
+    def handle(self, *args, **options):
+        for url in options["urls"]:
+            parts = urlsplit(url)
+            if parts.scheme != "http" or not parts.hostname:
+                raise CommandError(f"Only plain http:// URLs are supported: {url}")
+            self._run(parts, url, options)
+
+    def _run(self, parts, url, options):
+        path = parts.path + (f"?{parts.query}" if parts.query else "")
+        headers = {"X-API-KEY": options["key"], "Accept-Encoding": "gzip"}
+        deadline = time.perf_counter() + options["duration"]
+        lock = threading.Lock()
+        latencies = []
+        stats = {"ok": 0, "throttled": 0, "errors": 0}
+
+        def client():
+            conn = None
+            mine = []
+            ok = throttled = errors = 0
+            while time.perf_counter() < deadline:
+                if conn is None:
+                    conn = http.client.HTTPConnection(
+                        parts.hostname, parts.port or 80, timeout=options["timeout"]
+                    )
+                started = time.perf_counter()
+                try:
+                    conn.request("GET", path, headers=headers)
+                    response = conn.getresponse()
+                    response.read()
+                except (OSError, http.client.HTTPException):
+                    errors += 1
+                    conn.close()
+                    conn = None
+                    continue
+                mine.append(time.perf_counter() - started)
+                if response.status in (200, 304):
+                    ok += 1
+                elif response.status == 429:
+                    throttled += 1
+                else:
+                    errors += 1
+                if response.getheader("Connection", "").lower() == "close":
+                    conn.close()
+                    conn = None
+            if conn is not None:
+                conn.close()
+            with lock:
+                latencies.extend(mine)
+                stats["ok"] += ok
+                stats["throttled"] += throttled
+                stats["errors"] += errors
+
+        threads = [threading.Thread(target=client) for _ in range(options["concurrency"])]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+
+        def pct(p):
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+        self.stdout.write(
+            f"{url}\n  c={options['concurrency']} ok={stats['ok']} "
+            f"throttled={stats['throttled']} errors={stats['errors']} "
+            f"{stats['ok'] / elapsed:.1f} req/s  "
+            f"p50={pct(0.50):.1f} ms p95={pct(0.95):.1f} ms p99={pct(0.99):.1f} ms"
+        )
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Delete Idempotency-Key records older than IDEMPOTENCY_KEY_TTL"
+
+    def handle(self, *args, **options):
+        from pos.idempotency import prune
+
+        deleted = prune()
+        self.stdout.write(f"Removed {deleted} expired idempotency key(s)")
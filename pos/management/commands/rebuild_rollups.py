@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Rebuild the DailySales rollup table from existing orders"
+
+    def handle(self, *args, **options):
+        from pos.rollups import rebuild
+
+        count = rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} daily rollup row(s)"))
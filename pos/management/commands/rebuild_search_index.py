@@ -0,0 +1,44 @@
+import time
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Create (if needed) and repopulate the full-text search indexes for "
+        "products, customers and suppliers"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--query",
+            action="append",
+            default=[],
+            help="Time a product/customer search for this text afterwards "
+            "(repeatable)",
+        )
+
+    def handle(self, *args, **options):
+        from pos import search
+
+        started = time.perf_counter()
+        backend = search.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Search index rebuilt ({backend}) in "
+                f"{time.perf_counter() - started:.2f}s"
+            )
+        )
+        if backend == "like":
+            self.stdout.write(
+                self.style.WARNING(
+                    "No full-text support on this database; searches use icontains."
+                )
+            )
+
+        for query in options["query"]:
+            for kind in ("product", "customer"):
+                started = time.perf_counter()
+                ids = search.search_ids(kind, query)
+                elapsed = (time.perf_counter() - started) * 1000
+                hits = "-" if ids is None else len(ids)
+                self.stdout.write(f"{kind:<9} {query!r}: {hits} hit(s) in {elapsed:.1f} ms")
@@ -0,0 +1,67 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = "Render queued report exports (ExportJob) with a pool of worker threads"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--threads", type=int, default=2, help="Number of render threads"
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=2.0,
+            help="Seconds to wait between polls when the queue is empty",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Drain the queue once and exit instead of polling forever",
+        )
+        parser.add_argument(
+            "--keep-days",
+            type=int,
+            default=7,
+            help="Delete finished jobs and their files older than this",
+        )
+
+    def handle(self, *args, **options):
+        from pos.models import ExportJob
+        from pos.jobs import run_job, fail_stale_jobs, export_path
+
+        def work(job_id):
+            try:
+                return run_job(job_id)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=options["threads"]) as pool:
+            while True:
+                fail_stale_jobs()
+                self._purge(ExportJob, export_path, options["keep_days"])
+                pending = list(
+                    ExportJob.objects.filter(status="pending")
+                    .order_by("created_at")
+                    .values_list("pk", flat=True)[: options["threads"] * 4]
+                )
+                ran = sum(1 for ok in pool.map(work, pending) if ok)
+                if ran:
+                    self.stdout.write(f"Rendered {ran} export(s)")
+                if options["once"] and not pending:
+                    break
+                if not pending:
+                    time.sleep(options["interval"])
+
+    def _purge(self, ExportJob, export_path, keep_days):
+        cutoff = timezone.now() - timedelta(days=keep_days)
+        old = ExportJob.objects.filter(status__in=["done", "failed"], created_at__lt=cutoff)
+        for job in old:
+            if job.file_name:
+                export_path(job).unlink(missing_ok=True)
+        old.delete()
@@ -14,6 +14,7 @@ from pos.models import (
     PurchaseOrder,
     PurchaseOrderItem,
 )
+from pos.rollups import rebuild as rebuild_rollups
 
 
 class Command(BaseCommand):
@@ -256,6 +257,9 @@ class Command(BaseCommand):
                 f"  - Order #{order.id} - {customer.name} (Rp {order_total:,.0f})"
             )
 
+        # Seeded orders bypass checkout, so refresh the dashboard rollups.
+        rebuild_rollups()
+
         self.stdout.write(self.style.SUCCESS("\n✓ Database seeded successfully!"))
         self.stdout.write(f"  Categories: {Category.objects.count()}")
         self.stdout.write(f"  Suppliers: {Supplier.objects.count()}")
@@ -7,6 +7,7 @@ from pos.models import (
     Product, Customer, Category, Supplier,
     Order, OrderItem, PurchaseOrder, PurchaseOrderItem
 )
+from pos.rollups import rebuild as rebuild_rollups
 
 try:
     from faker import Faker
@@ -175,6 +176,9 @@ class Command(BaseCommand):
             order.total_price = total
             order.save(update_fields=['total_price'])
 
+        # Seeded orders bypass checkout, so refresh the dashboard rollups.
+        rebuild_rollups()
+
         self.stdout.write(self.style.SUCCESS('\n seed_demo_data selesai'))
         self.stdout.write(f'  Kategori: {Category.objects.count()}')
         self.stdout.write(f'  Produk: {Product.objects.count()}')
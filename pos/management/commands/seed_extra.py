@@ -14,6 +14,7 @@ from pos.models import (
     PurchaseOrder,
     PurchaseOrderItem,
 )
+from pos.rollups import rebuild as rebuild_rollups
 
 
 class Command(BaseCommand):
@@ -152,6 +153,9 @@ class Command(BaseCommand):
             created_orders += 1
         self.stdout.write(f"Sales orders created: {created_orders}")
 
+        # Seeded orders bypass checkout, so refresh the dashboard rollups.
+        rebuild_rollups()
+
         self.stdout.write(self.style.SUCCESS("Done."))
         self.stdout.write(f"  Categories: {Category.objects.count()}")
         self.stdout.write(f"  Products: {Product.objects.count()}")
@@ -1,6 +1,7 @@
 from decimal import Decimal
 import random
 from django.core.management.base import BaseCommand
+from pos.rollups import rebuild as rebuild_rollups
 
 try:
     from faker import Faker
@@ -230,6 +231,9 @@ class Command(BaseCommand):
             order.total_price = total
             order.save(update_fields=["total_price"])
 
+        # Seeded orders bypass checkout, so refresh the dashboard rollups.
+        rebuild_rollups()
+
         self.stdout.write(self.style.SUCCESS("Seeding complete."))
 
         self.stdout.write("Summary:")
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-17 17:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0010_analytics_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TopSellerSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('day', 'Hari'), ('hour', 'Jam')], max_length=10)),
+                ('period', models.CharField(max_length=13)),
+                ('data', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='topsellersnapshot',
+            constraint=models.UniqueConstraint(fields=('scope', 'period'), name='pos_topsellersnapshot_period'),
+        ),
+    ]
@@ -0,0 +1,184 @@
+"""Full-text search structures for products, customers and suppliers.
+
+The SQL is spelled out here so the migration does not depend on
+``pos.search``; ``pos.search.ensure()`` re-creates anything a later
+table-copying migration drops.
+"""
+
+from django.db import DatabaseError, migrations, transaction
+
+SQLITE_INSTALL = [
+    (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS pos_product_search USING fts5(name, "
+        "description, content='pos_product', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    ),
+    (
+        "CREATE TRIGGER IF NOT EXISTS pos_product_search_ai AFTER INSERT ON "
+        "pos_product BEGIN INSERT INTO pos_product_search(rowid, name, "
+        "description) VALUES (new.id, new.name, new.description); END"
+    ),
+    (
+        "CREATE TRIGGER IF NOT EXISTS pos_product_search_ad AFTER DELETE ON "
+        "pos_product BEGIN INSERT INTO pos_product_search(pos_product_search, "
+        "rowid, name, description) VALUES ('delete', old.id, old.name, "
+        "old.description); END"
+    ),
+    (
+        "CREATE TRIGGER IF NOT EXISTS pos_product_search_au AFTER UPDATE OF name, "
+        "description ON pos_product BEGIN INSERT INTO "
+        "pos_product_search(pos_product_search, rowid, name, description) VALUES "
+        "('delete', old.id, old.name, old.description); INSERT INTO "
+        "pos_product_search(rowid, name, description) VALUES (new.id, new.name, "
+        "new.description); END"
+    ),
+    (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS pos_customer_search USING fts5(name, "
+        "phone, content='pos_customer', content_rowid='id', tokenize='unicode61 "
+        "remove_diacritics 2', prefix='2 3')"
+    ),
+    (
+        "CREATE TRIGGER IF NOT EXISTS pos_customer_search_ai AFTER INSERT ON "
+        "pos_customer BEGIN INSERT INTO pos_customer_search(rowid, name, phone) "
+        "VALUES (new.id, new.name, new.phone); END"
+    ),
+    (
+        "CREATE TRIGGER IF NOT EXISTS pos_customer_search_ad AFTER DELETE ON "
+        "pos_customer BEGIN INSERT INTO pos_customer_search(pos_customer_search, "
+        "rowid, name, phone) VALUES ('delete', old.id, old.name, old.phone); END"
+    ),
+    (
+        "CREATE TRIGGER IF NOT EXISTS pos_customer_search_au AFTER UPDATE OF name, "
+        "phone ON pos_customer BEGIN INSERT INTO "
+        "pos_customer_search(pos_customer_search, rowid, name, phone) VALUES "
+        "('delete', old.id, old.name, old.phone); INSERT INTO "
+        "pos_customer_search(rowid, name, phone) VALUES (new.id, new.name, "
+        "new.phone); END"
+    ),
+    (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS pos_supplier_search USING fts5(name, "
+        "contact_person, phone, email, content='pos_supplier', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    ),
+    (
+        "CREATE TRIGGER IF NOT EXISTS pos_supplier_search_ai AFTER INSERT ON "
+        "pos_supplier BEGIN INSERT INTO pos_supplier_search(rowid, name, "
+        "contact_person, phone, email) VALUES (new.id, new.name, "
+        "new.contact_person, new.phone, new.email); END"
+    ),
+    (
+        "CREATE TRIGGER IF NOT EXISTS pos_supplier_search_ad AFTER DELETE ON "
+        "pos_supplier BEGIN INSERT INTO pos_supplier_search(pos_supplier_search, "
+        "rowid, name, contact_person, phone, email) VALUES ('delete', old.id, "
+        "old.name, old.contact_person, old.phone, old.email); END"
+    ),
+    (
+        "CREATE TRIGGER IF NOT EXISTS pos_supplier_search_au AFTER UPDATE OF name, "
+        "contact_person, phone, email ON pos_supplier BEGIN INSERT INTO "
+        "pos_supplier_search(pos_supplier_search, rowid, name, contact_person, "
+        "phone, email) VALUES ('delete', old.id, old.name, old.contact_person, "
+        "old.phone, old.email); INSERT INTO pos_supplier_search(rowid, name, "
+        "contact_person, phone, email) VALUES (new.id, new.name, "
+        "new.contact_person, new.phone, new.email); END"
+    ),
+]
+SQLITE_REBUILD = [
+    "INSERT INTO pos_product_search(pos_product_search) VALUES ('rebuild')",
+    "INSERT INTO pos_customer_search(pos_customer_search) VALUES ('rebuild')",
+    "INSERT INTO pos_supplier_search(pos_supplier_search) VALUES ('rebuild')",
+]
+SQLITE_UNINSTALL = [
+    'DROP TABLE IF EXISTS pos_product_search',
+    'DROP TRIGGER IF EXISTS pos_product_search_ai',
+    'DROP TRIGGER IF EXISTS pos_product_search_ad',
+    'DROP TRIGGER IF EXISTS pos_product_search_au',
+    'DROP TABLE IF EXISTS pos_customer_search',
+    'DROP TRIGGER IF EXISTS pos_customer_search_ai',
+    'DROP TRIGGER IF EXISTS pos_customer_search_ad',
+    'DROP TRIGGER IF EXISTS pos_customer_search_au',
+    'DROP TABLE IF EXISTS pos_supplier_search',
+    'DROP TRIGGER IF EXISTS pos_supplier_search_ai',
+    'DROP TRIGGER IF EXISTS pos_supplier_search_ad',
+    'DROP TRIGGER IF EXISTS pos_supplier_search_au',
+]
+POSTGRES_INSTALL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    (
+        "CREATE INDEX IF NOT EXISTS pos_product_search_fts ON pos_product USING "
+        "gin ((setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(description, '')), 'B')))"
+    ),
+    (
+        "CREATE INDEX IF NOT EXISTS pos_product_search_trgm ON pos_product USING "
+        "gin (name gin_trgm_ops)"
+    ),
+    (
+        "CREATE INDEX IF NOT EXISTS pos_customer_search_fts ON pos_customer USING "
+        "gin ((setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(phone, '')), 'B')))"
+    ),
+    (
+        "CREATE INDEX IF NOT EXISTS pos_customer_search_trgm ON pos_customer USING "
+        "gin (name gin_trgm_ops)"
+    ),
+    (
+        "CREATE INDEX IF NOT EXISTS pos_supplier_search_fts ON pos_supplier USING "
+        "gin ((setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(contact_person, '')), 'B') || "
+        "setweight(to_tsvector('simple', coalesce(phone, '')), 'C') || "
+        "setweight(to_tsvector('simple', coalesce(email, '')), 'D')))"
+    ),
+    (
+        "CREATE INDEX IF NOT EXISTS pos_supplier_search_trgm ON pos_supplier USING "
+        "gin (name gin_trgm_ops)"
+    ),
+]
+POSTGRES_UNINSTALL = [
+    'DROP INDEX IF EXISTS pos_product_search_fts',
+    'DROP INDEX IF EXISTS pos_product_search_trgm',
+    'DROP INDEX IF EXISTS pos_customer_search_fts',
+    'DROP INDEX IF EXISTS pos_customer_search_trgm',
+    'DROP INDEX IF EXISTS pos_supplier_search_fts',
+    'DROP INDEX IF EXISTS pos_supplier_search_trgm',
+]
+
+
+def install(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == "postgresql":
+        statements = POSTGRES_INSTALL
+    elif connection.vendor == "sqlite":
+        statements = SQLITE_INSTALL + SQLITE_REBUILD
+    else:
+        return
+    try:
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                for statement in statements:
+                    cursor.execute(statement)
+    except DatabaseError:
+        if connection.vendor == "postgresql":
+            raise
+        # SQLite built without FTS5: search falls back to icontains.
+
+
+def uninstall(apps, schema_editor):
+    connection = schema_editor.connection
+    statements = {
+        "sqlite": SQLITE_UNINSTALL,
+        "postgresql": POSTGRES_UNINSTALL,
+    }.get(connection.vendor, [])
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0011_topsellersnapshot'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-17 17:34
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0012_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='barcode',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True, validators=[django.core.validators.RegexValidator('^[0-9A-Za-z.\\-]+$', 'Barcode hanya boleh berisi huruf, angka, titik dan tanda minus.')]),
+        ),
+    ]
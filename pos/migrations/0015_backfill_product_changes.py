@@ -0,0 +1,30 @@
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def backfill(apps, schema_editor):
+    """Give every existing product a change so a first sync sees it."""
+    Product = apps.get_model("pos", "Product")
+    ProductChange = apps.get_model("pos", "ProductChange")
+    ids = Product.objects.order_by("pk").values_list("pk", flat=True)
+    ProductChange.objects.bulk_create(
+        (ProductChange(product_id=pk) for pk in ids.iterator()), batch_size=1000
+    )
+    Product.objects.update(
+        change_seq=Subquery(
+            ProductChange.objects.filter(product_id=OuterRef("pk")).values("pk")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+    # Separate from 0014 so the ProductChange.product_id index exists
+    # before the backfill looks rows up by it.
+
+    dependencies = [
+        ("pos", "0014_product_change_seq"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
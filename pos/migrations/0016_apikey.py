@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-17 17:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0015_backfill_product_changes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApiKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Terminal / integrasi', max_length=100)),
+                ('prefix', models.CharField(db_index=True, editable=False, max_length=8)),
+                ('key_hash', models.CharField(editable=False, max_length=64, unique=True)),
+                ('scopes', models.CharField(default='read', max_length=100)),
+                ('rate', models.FloatField(default=5.0)),
+                ('burst', models.PositiveIntegerField(default=20)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
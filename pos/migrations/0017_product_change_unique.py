@@ -0,0 +1,25 @@
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def drop_duplicates(apps, schema_editor):
+    """Keep only the newest change per product before adding the constraint."""
+    ProductChange = apps.get_model("pos", "ProductChange")
+    newest = ProductChange.objects.values("product_id").annotate(seq=Max("pk"))
+    ProductChange.objects.exclude(pk__in=newest.values("seq")).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pos", "0016_apikey"),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicates, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="productchange",
+            name="product_id",
+            field=models.BigIntegerField(unique=True),
+        ),
+    ]
@@ -0,0 +1,99 @@
+from decimal import Decimal
+from django.db import migrations
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import ExtractHour, TruncDate
+
+CENT = Decimal("0.01")
+
+
+def backfill(apps, schema_editor):
+    """Fill the sales rollups from the orders placed before they existed.
+
+    Orders created before 0007/0010 were never counted. A copy of
+    ``pos.rollups.rebuild`` so later changes to that module cannot break
+    this migration.
+    """
+    Order = apps.get_model("pos", "Order")
+    OrderItem = apps.get_model("pos", "OrderItem")
+    DailySales = apps.get_model("pos", "DailySales")
+    HourlySales = apps.get_model("pos", "HourlySales")
+    DailyProductSales = apps.get_model("pos", "DailyProductSales")
+    DailyCategorySales = apps.get_model("pos", "DailyCategorySales")
+
+    def money(value):
+        return Decimal(value or 0).quantize(CENT)
+
+    line_revenue_x100 = ExpressionWrapper(
+        F("quantity") * F("price") * (100 - F("discount_percent")),
+        output_field=DecimalField(max_digits=16, decimal_places=2),
+    )
+    orders = Order.objects.annotate(day=TruncDate("created_at"))
+    lines = OrderItem.objects.annotate(day=TruncDate("order__created_at"))
+
+    for model in (DailySales, HourlySales, DailyProductSales, DailyCategorySales):
+        model.objects.all().delete()
+    DailySales.objects.bulk_create(
+        DailySales(
+            date=row["day"],
+            revenue=money(row["revenue"]),
+            order_count=row["order_count"],
+        )
+        for row in orders.values("day")
+        .annotate(revenue=Sum("total_price"), order_count=Count("id"))
+        .order_by()
+    )
+    HourlySales.objects.bulk_create(
+        (
+            HourlySales(
+                date=row["day"],
+                hour=row["hour"],
+                revenue=money(row["revenue"]),
+                order_count=row["order_count"],
+            )
+            for row in orders.annotate(hour=ExtractHour("created_at"))
+            .values("day", "hour")
+            .annotate(revenue=Sum("total_price"), order_count=Count("id"))
+            .order_by()
+        ),
+        batch_size=1000,
+    )
+    DailyProductSales.objects.bulk_create(
+        (
+            DailyProductSales(
+                date=row["day"],
+                product_id=row["product_id"],
+                quantity=row["units"],
+                revenue=money(Decimal(row["sales"] or 0) / 100),
+            )
+            for row in lines.values("day", "product_id")
+            .annotate(sales=Sum(line_revenue_x100), units=Sum("quantity"))
+            .order_by()
+        ),
+        batch_size=1000,
+    )
+    DailyCategorySales.objects.bulk_create(
+        (
+            DailyCategorySales(
+                date=row["day"],
+                category_id=row["category_id"],
+                quantity=row["units"],
+                revenue=money(Decimal(row["sales"] or 0) / 100),
+            )
+            for row in lines.filter(product__category__isnull=False)
+            .values("day", category_id=F("product__category_id"))
+            .annotate(sales=Sum(line_revenue_x100), units=Sum("quantity"))
+            .order_by()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pos", "0017_product_change_unique"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,5 @@
+from django.conf import settings
+from django.core.validators import RegexValidator
 from django.db import models
 
 
@@ -42,7 +44,24 @@ class Product(models.Model):
     stock = models.IntegerField()
     image_url = models.URLField(blank=True)
     description = models.TextField(blank=True)
+    # EAN/UPC or in-house SKU printed on the label; NULL when not labelled
+    barcode = models.CharField(
+        max_length=64,
+        unique=True,
+        null=True,
+        blank=True,
+        validators=[
+            RegexValidator(
+                r"^[0-9A-Za-z.\-]+$",
+                "Barcode hanya boleh berisi huruf, angka, titik dan tanda minus.",
+            )
+        ],
+    )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Sequence number of the latest ProductChange for this row (see
+    # ``pos.changefeed``); tills sync with ``?since=<change_seq>``
+    change_seq = models.BigIntegerField(default=0, db_index=True)
 
     def __str__(self):
         return self.name
@@ -65,6 +84,12 @@ class Order(models.Model):
     total_price = models.DecimalField(max_digits=12, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Serves date-range filters and (created_at, id) keyset pagination
+            models.Index(fields=["created_at", "id"], name="pos_order_created_id_idx"),
+        ]
+
     def __str__(self):
         return f"Order #{self.id} - {self.customer.name}"
 
@@ -127,3 +152,214 @@ class PurchaseOrderItem(models.Model):
 
     def __str__(self):
         return f"{self.quantity} x {self.product.name}"
+
+
+class IdempotencyKey(models.Model):
+    """Client-supplied ``Idempotency-Key`` remembered for the order API.
+
+    Written in the same transaction as the order it produced, so a retried
+    request can be answered with the original order instead of a duplicate.
+    """
+
+    key = models.CharField(max_length=255, unique=True)
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="+")
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.key} -> Order #{self.order_id}"
+
+
+class DailySales(models.Model):
+    """Per-day revenue and order count, maintained at checkout.
+
+    Rebuild from ``Order`` with ``manage.py rebuild_rollups``.
+    """
+
+    date = models.DateField(unique=True)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    order_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "Daily sales"
+        ordering = ["-date"]
+
+    def __str__(self):
+        return f"{self.date}: {self.order_count} order(s)"
+
+
+class ExportJob(models.Model):
+    """A report export rendered in the background and kept for download."""
+
+    FORMAT_CHOICES = [
+        ("pdf", "PDF"),
+        ("excel", "Excel"),
+    ]
+    STATUS_CHOICES = [
+        ("pending", "Menunggu"),
+        ("running", "Diproses"),
+        ("done", "Selesai"),
+        ("failed", "Gagal"),
+    ]
+    IN_FLIGHT = ("pending", "running")
+
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    # SalesReport query parameters (period or start/end)
+    params = models.JSONField(default=dict)
+    # Identifies identical requests so they can share one in-flight job
+    dedupe_key = models.CharField(max_length=255)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    file_name = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["dedupe_key"],
+                condition=models.Q(status__in=["pending", "running"]),
+                name="pos_exportjob_one_in_flight",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Export #{self.id} ({self.format}, {self.status})"
+
+
+class HourlySales(models.Model):
+    """Per-hour (local time) revenue and order count, maintained at checkout."""
+
+    date = models.DateField()
+    hour = models.PositiveSmallIntegerField()
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    order_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "Hourly sales"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["date", "hour"], name="pos_hourlysales_date_hour"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.hour:02d}:00: {self.order_count} order(s)"
+
+
+class DailyCategorySales(models.Model):
+    """Per-day units sold and revenue (after discount) for one category."""
+
+    date = models.DateField()
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name="+")
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name_plural = "Daily category sales"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["date", "category"], name="pos_dailycategorysales_date_cat"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.category}: {self.quantity}"
+
+
+class DailyProductSales(models.Model):
+    """Per-day units sold and revenue (after discount) for one product."""
+
+    date = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+")
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name_plural = "Daily product sales"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["date", "product"], name="pos_dailyproductsales_date_prod"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.product}: {self.quantity}"
+
+
+class TopSellerSnapshot(models.Model):
+    """Persisted best-seller sketch for one day or hour (see ``pos.topk``)."""
+
+    SCOPE_CHOICES = [
+        ("day", "Hari"),
+        ("hour", "Jam"),
+    ]
+
+    scope = models.CharField(max_length=10, choices=SCOPE_CHOICES)
+    # Local period, "YYYY-MM-DD" for days or "YYYY-MM-DDTHH" for hours
+    period = models.CharField(max_length=13)
+    data = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["scope", "period"], name="pos_topsellersnapshot_period"
+            ),
+        ]
+
+    def __str__(self):
+        return f"Top sellers {self.scope} {self.period}"
+
+
+class ProductChange(models.Model):
+    """Latest change of one product, keyed by a growing sequence number.
+
+    The auto-increment ``id`` is the change sequence. Only the newest row
+    per product is kept, so deletes leave a single tombstone behind.
+    """
+
+    # Plain integer rather than a ForeignKey so tombstones outlive the row
+    product_id = models.BigIntegerField(unique=True)
+    deleted = models.BooleanField(default=False)
+
+    def __str__(self):
+        action = "deleted" if self.deleted else "changed"
+        return f"#{self.pk} product {self.product_id} {action}"
+
+
+class ApiKey(models.Model):
+    """Credential of one terminal or integration for the JSON API.
+
+    Only a SHA-256 of the key is stored; the key itself is shown once by
+    ``manage.py create_api_key``. ``prefix`` (its first characters) finds
+    the candidate row without scanning. See ``pos.apikeys``.
+    """
+
+    SCOPE_READ = "read"
+    SCOPE_WRITE = "write"
+
+    name = models.CharField(max_length=100, help_text="Terminal / integrasi")
+    prefix = models.CharField(max_length=8, db_index=True, editable=False)
+    key_hash = models.CharField(max_length=64, unique=True, editable=False)
+    # Comma-separated, e.g. "read,write"
+    scopes = models.CharField(max_length=100, default=SCOPE_READ)
+    # Token bucket: sustained requests per second and burst size
+    rate = models.FloatField(default=5.0)
+    burst = models.PositiveIntegerField(default=20)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def scope_set(self):
+        return frozenset(s.strip() for s in self.scopes.split(",") if s.strip())
+
+    def __str__(self):
+        return f"{self.name} ({self.prefix}…)"
@@ -0,0 +1,112 @@
+import base64
+from datetime import datetime
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def encode_cursor(direction, obj):
+    """Encode ``obj``'s ``(created_at, id)`` position as an opaque string.
+
+    ``direction`` is ``"n"`` (rows after ``obj``) or ``"p"`` (rows before it).
+    """
+    raw = f"{direction}|{obj.created_at.isoformat()}|{obj.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Return ``(direction, created_at, id)`` for a cursor string."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        direction, created_at, pk = (
+            base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        )
+        if direction not in ("n", "p"):
+            raise ValueError(direction)
+        return direction, datetime.fromisoformat(created_at), int(pk)
+    except Exception as exc:
+        raise InvalidCursor("Invalid cursor") from exc
+
+
+class KeysetPage:
+    """One page of a keyset-paginated queryset (newest first)."""
+
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def _keyset_queryset(queryset, cursor):
+    """Order/filter ``queryset`` for ``cursor``; returns ``(qs, backwards)``."""
+    backwards = False
+    if cursor:
+        direction, created_at, pk = decode_cursor(cursor)
+        backwards = direction == "p"
+        if backwards:
+            queryset = queryset.filter(
+                Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk)
+            ).order_by("created_at", "pk")
+        else:
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+            ).order_by("-created_at", "-pk")
+    else:
+        queryset = queryset.order_by("-created_at", "-pk")
+    return queryset, backwards
+
+
+def _keyset_page(rows, cursor, per_page, backwards):
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    if not rows:
+        return KeysetPage([], None, None)
+
+    # Going forward there is a previous page whenever we came from a cursor;
+    # going backwards there is always a next page (the one we came from).
+    more_after = has_more if not backwards else True
+    more_before = has_more if backwards else bool(cursor)
+    return KeysetPage(
+        rows,
+        encode_cursor("n", rows[-1]) if more_after else None,
+        encode_cursor("p", rows[0]) if more_before else None,
+    )
+
+
+def keyset_paginate(queryset, cursor=None, per_page=25):
+    """Return a ``KeysetPage`` of ``queryset`` ordered by ``-created_at, -id``.
+
+    Each page is a single indexed range scan of ``per_page + 1`` rows, so
+    page N costs the same as page 1, and no COUNT query is issued.
+    Raises ``InvalidCursor`` for a malformed ``cursor``.
+    """
+    queryset, backwards = _keyset_queryset(queryset, cursor)
+    rows = list(queryset[: per_page + 1])
+    return _keyset_page(rows, cursor, per_page, backwards)
+
+
+async def akeyset_paginate(queryset, cursor=None, per_page=25):
+    """``keyset_paginate`` for async views, using the async ORM."""
+    queryset, backwards = _keyset_queryset(queryset, cursor)
+    rows = [obj async for obj in queryset[: per_page + 1]]
+    return _keyset_page(rows, cursor, per_page, backwards)
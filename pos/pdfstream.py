@@ -0,0 +1,132 @@
+import zlib
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+
+class StreamingCanvas:
+    """Minimal PDF writer that can hand out finished pages as bytes.
+
+    ReportLab's ``canvas.Canvas`` keeps every page in memory until
+    ``save()``. This class implements the subset of the canvas API used by
+    the report layout (``setFont``, ``drawString``, ``drawRightString``,
+    ``drawCentredString``, ``line``, ``showPage``, ``save``) and writes each
+    page out as soon as it is complete, so memory stays bounded by one page.
+    Only the standard Helvetica fonts are supported; text is WinAnsi encoded.
+
+    Call ``drain()`` to collect the bytes produced since the last call.
+    """
+
+    FONTS = {"Helvetica": "F1", "Helvetica-Bold": "F2"}
+
+    # Fixed object numbers; page content/page objects follow from 5.
+    CATALOG, PAGES = 1, 2
+
+    def __init__(self, pagesize):
+        self.width, self.height = pagesize
+        self._chunks = []
+        self._offset = 0
+        self._xref = {}
+        self._next_obj = 3 + len(self.FONTS)
+        self._kids = []
+        self._ops = []
+        self._font = ("Helvetica", 12)
+
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        for num, (name, _) in enumerate(self.FONTS.items(), start=3):
+            self._write_obj(
+                num,
+                f"<< /Type /Font /Subtype /Type1 /BaseFont /{name} "
+                f"/Encoding /WinAnsiEncoding >>".encode(),
+            )
+
+    # canvas API ---------------------------------------------------------
+
+    def setFont(self, name, size):
+        self._font = (name, size)
+
+    def drawString(self, x, y, text):
+        self._ops.append(
+            f"BT /{self.FONTS[self._font[0]]} {self._font[1]} Tf "
+            f"{x:.2f} {y:.2f} Td {self._literal(text)} Tj ET"
+        )
+
+    def drawRightString(self, x, y, text):
+        self.drawString(x - stringWidth(text, *self._font), y, text)
+
+    def drawCentredString(self, x, y, text):
+        self.drawString(x - stringWidth(text, *self._font) / 2, y, text)
+
+    def line(self, x1, y1, x2, y2):
+        self._ops.append(f"{x1:.2f} {y1:.2f} m {x2:.2f} {y2:.2f} l S")
+
+    def showPage(self):
+        content = zlib.compress("\n".join(self._ops).encode("latin-1"))
+        content_num, page_num = self._next_obj, self._next_obj + 1
+        self._next_obj += 2
+        self._write_obj(
+            content_num,
+            f"<< /Length {len(content)} /Filter /FlateDecode >>\nstream\n".encode()
+            + content
+            + b"\nendstream",
+        )
+        fonts = " ".join(
+            f"/{alias} {num} 0 R"
+            for num, alias in enumerate(self.FONTS.values(), start=3)
+        )
+        self._write_obj(
+            page_num,
+            f"<< /Type /Page /Parent {self.PAGES} 0 R "
+            f"/MediaBox [0 0 {self.width:.2f} {self.height:.2f}] "
+            f"/Resources << /Font << {fonts} >> >> "
+            f"/Contents {content_num} 0 R >>".encode(),
+        )
+        self._kids.append(page_num)
+        self._ops = []
+        self._font = ("Helvetica", 12)
+
+    def save(self):
+        if self._ops or not self._kids:
+            self.showPage()
+        kids = " ".join(f"{num} 0 R" for num in self._kids)
+        self._write_obj(
+            self.PAGES,
+            f"<< /Type /Pages /Kids [{kids}] /Count {len(self._kids)} >>".encode(),
+        )
+        self._write_obj(
+            self.CATALOG, f"<< /Type /Catalog /Pages {self.PAGES} 0 R >>".encode()
+        )
+
+        xref_at = self._offset
+        size = self._next_obj
+        rows = ["xref", f"0 {size}", "0000000000 65535 f "]
+        rows += [f"{self._xref[num]:010d} 00000 n " for num in range(1, size)]
+        rows += [
+            "trailer",
+            f"<< /Size {size} /Root {self.CATALOG} 0 R >>",
+            "startxref",
+            str(xref_at),
+            "%%EOF",
+            "",
+        ]
+        self._write("\n".join(rows).encode())
+
+    def drain(self):
+        """Return (and forget) the bytes written since the previous call."""
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+    # internals ----------------------------------------------------------
+
+    def _write(self, data):
+        self._chunks.append(data)
+        self._offset += len(data)
+
+    def _write_obj(self, num, body):
+        self._xref[num] = self._offset
+        self._write(f"{num} 0 obj\n".encode() + body + b"\nendobj\n")
+
+    @staticmethod
+    def _literal(text):
+        raw = str(text).encode("cp1252", errors="replace").decode("latin-1")
+        raw = raw.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+        return f"({raw})"
@@ -0,0 +1,140 @@
+"""Printer-independent receipt layout shared by the PDF and ESC/POS renderers.
+
+``build_receipt_layout`` turns an order into a list of ``(kind, left, right)``
+lines. Renderers only decide how each kind looks, so the PDF and the thermal
+printer output always carry the same content.
+
+Kinds: ``title``, ``center``, ``text``, ``header``, ``item``, ``detail``,
+``amount``, ``total``, ``footer``, ``rule`` and ``space`` (extra gap, in mm,
+ignored by text renderers).
+"""
+
+from django.utils import timezone
+
+STORE_NAME = "MINI POS"
+STORE_ADDRESS = "Jl. Contoh No. 123"
+STORE_PHONE = "Telp: 08123456789"
+FOOTER_LINES = [
+    "Terima kasih atas kunjungan Anda",
+    "Barang yang sudah dibeli",
+    "tidak dapat ditukar/dikembalikan",
+]
+
+# Characters per line on a 58mm printer with the default font (Font A).
+ESCPOS_COLUMNS = 32
+
+
+def build_receipt_layout(order):
+    """Return the receipt for ``order`` as a list of ``(kind, left, right)``."""
+    # Printed in the shop's time zone, like the Excel export
+    created = timezone.localtime(order.created_at)
+    lines = [
+        ("title", STORE_NAME, ""),
+        ("center", STORE_ADDRESS, ""),
+        ("center", STORE_PHONE, ""),
+        ("space", 2, ""),
+        ("rule", "", ""),
+        ("text", f"No: #{order.id}", ""),
+        ("text", f"Tanggal: {created.strftime('%d/%m/%Y %H:%M')}", ""),
+        ("text", f"Pelanggan: {order.customer.name}", ""),
+        ("space", 1, ""),
+        ("rule", "", ""),
+        ("header", "Item", "Subtotal"),
+    ]
+
+    for item in order.items.all():
+        # Product name (might wrap if too long)
+        product_name = item.product.name
+        if len(product_name) > 25:
+            product_name = product_name[:22] + "..."
+        lines.append(("item", product_name, ""))
+        lines.append(("detail", f"{item.quantity} x Rp {item.price:,.0f}", ""))
+        if item.discount_percent > 0:
+            lines.append(
+                (
+                    "detail",
+                    f"Diskon {item.discount_percent}% "
+                    f"(-Rp {item.discount_amount():,.0f})",
+                    "",
+                )
+            )
+        lines.append(("amount", "", f"Rp {item.subtotal():,.0f}"))
+
+    lines += [
+        ("rule", "", ""),
+        ("total", "TOTAL", f"Rp {order.total_price:,.0f}"),
+        ("rule", "", ""),
+        ("space", 1, ""),
+    ]
+    lines += [("footer", text, "") for text in FOOTER_LINES]
+    return lines
+
+
+# ESC/POS control sequences
+ESC_INIT = b"\x1b@"
+ESC_ALIGN = {"left": b"\x1ba\x00", "center": b"\x1ba\x01", "right": b"\x1ba\x02"}
+ESC_BOLD_ON, ESC_BOLD_OFF = b"\x1bE\x01", b"\x1bE\x00"
+GS_DOUBLE, GS_NORMAL = b"\x1d!\x11", b"\x1d!\x00"
+GS_FEED_CUT = b"\x1dVB\x03"  # feed 3 lines, then partial cut
+
+
+def _pair(left, right, width=ESCPOS_COLUMNS):
+    gap = width - len(left) - len(right)
+    if gap < 1:
+        left = left[: max(width - len(right) - 1, 0)]
+        gap = width - len(left) - len(right)
+    return left + " " * gap + right
+
+
+def render_receipt_text(lines, width=ESCPOS_COLUMNS):
+    """Render a layout as plain monospaced text, ``width`` columns wide."""
+    out = []
+    for kind, left, right in lines:
+        if kind == "space":
+            continue
+        if kind == "rule":
+            out.append("-" * width)
+        elif kind in ("title", "center", "footer"):
+            out.append(left.center(width).rstrip())
+        elif kind == "detail":
+            out.append(("  " + left)[:width])
+        elif kind in ("header", "amount", "total"):
+            out.append(_pair(left, right, width))
+        else:
+            out.append(left[:width])
+    return "\n".join(out) + "\n"
+
+
+def render_receipt_escpos(lines, width=ESCPOS_COLUMNS):
+    """Render a layout as an ESC/POS byte stream for a thermal printer."""
+    out = [ESC_INIT]
+    for kind, left, right in lines:
+        if kind == "space":
+            continue
+        if kind == "title":
+            out += [ESC_ALIGN["center"], GS_DOUBLE, _encode(left), b"\n", GS_NORMAL]
+        elif kind in ("center", "footer"):
+            out += [ESC_ALIGN["center"], _encode(left), b"\n"]
+        elif kind in ("header", "total"):
+            out += [
+                ESC_ALIGN["left"],
+                ESC_BOLD_ON,
+                _encode(_pair(left, right, width)),
+                b"\n",
+                ESC_BOLD_OFF,
+            ]
+        elif kind == "rule":
+            out += [ESC_ALIGN["left"], b"-" * width, b"\n"]
+        elif kind == "amount":
+            out += [ESC_ALIGN["right"], _encode(right), b"\n"]
+        elif kind == "detail":
+            out += [ESC_ALIGN["left"], _encode(("  " + left)[:width]), b"\n"]
+        else:
+            out += [ESC_ALIGN["left"], _encode(left[:width]), b"\n"]
+    out.append(GS_FEED_CUT)
+    return b"".join(out)
+
+
+def _encode(text):
+    # Code page 437 is the power-on default of practically every printer.
+    return text.encode("cp437", errors="replace")
@@ -0,0 +1,120 @@
+import hashlib
+import os
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from django.conf import settings
+from django.db.models import Prefetch
+from .models import Order, OrderItem
+from .receipt_layout import build_receipt_layout
+from .utils import generate_receipt_pdf, render_receipt_pdf_bytes
+
+# Bump when the receipt layout changes so cached files are re-rendered.
+RECEIPT_LAYOUT_VERSION = "3"
+
+
+def receipt_orders(queryset=None):
+    """Orders with their customer and item products prefetched (two queries)."""
+    if queryset is None:
+        queryset = Order.objects.all()
+    return queryset.select_related("customer").prefetch_related(
+        Prefetch("items", queryset=OrderItem.objects.select_related("product"))
+    )
+
+
+def load_order(pk):
+    """Fetch one order ready for receipt rendering."""
+    return receipt_orders().get(pk=pk)
+
+
+def receipt_etag(lines):
+    """Content hash of a receipt layout (see ``build_receipt_layout``)."""
+    h = hashlib.sha256(RECEIPT_LAYOUT_VERSION.encode())
+    for line in lines:
+        h.update(repr(line).encode())
+    return h.hexdigest()[:32]
+
+
+def cached_receipt(order, lines, etag):
+    """Return the path of ``order``'s receipt PDF, rendering it on a miss.
+
+    Files are named ``<order id>-<etag>.pdf``, so an order whose content
+    changed simply misses. A hit refreshes the file's mtime; when the
+    directory grows past RECEIPT_CACHE_MAX_BYTES the least recently used
+    files are deleted.
+    """
+    cache_dir = settings.RECEIPT_CACHE_DIR
+    path = cache_dir / f"{order.pk}-{etag}.pdf"
+    try:
+        os.utime(path)
+        return path
+    except FileNotFoundError:
+        pass
+
+    os.makedirs(cache_dir, exist_ok=True)
+    pdf = generate_receipt_pdf(order, lines)
+    # Write to a temporary name first so readers never see a partial file
+    fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    with os.fdopen(fd, "wb") as out:
+        out.write(pdf.getvalue())
+    os.replace(tmp, path)
+    _evict(cache_dir, settings.RECEIPT_CACHE_MAX_BYTES)
+    return path
+
+
+def _evict(cache_dir, max_bytes):
+    entries = []
+    total = 0
+    for entry in os.scandir(cache_dir):
+        if entry.name.endswith(".pdf"):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+    if total <= max_bytes:
+        return
+    for _, size, path in sorted(entries):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        total -= size
+        if total <= max_bytes:
+            break
+
+
+def write_receipt_bundle(orders, out, fmt="zip", workers=None):
+    """Render receipts for ``orders`` in parallel and write them to ``out``.
+
+    ``orders`` should come from ``receipt_orders()`` so layouts are built
+    from prefetched rows in this process; only the layouts are sent to the
+    ``ProcessPoolExecutor`` workers, which render the PDFs. ``fmt`` is
+    ``"zip"`` (one ``receipt_<id>.pdf`` per order) or ``"pdf"`` (a single
+    merged document, requires pypdf). Returns the number of receipts.
+    """
+    if fmt == "pdf":
+        try:
+            from pypdf import PdfWriter
+        except ImportError:
+            raise RuntimeError("Merged PDF output requires the pypdf package")
+
+    jobs = [(order.pk, build_receipt_layout(order)) for order in orders]
+    if not jobs:
+        return 0
+
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(jobs) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pdfs = pool.map(
+            render_receipt_pdf_bytes, [lines for _, lines in jobs], chunksize=chunksize
+        )
+        if fmt == "pdf":
+            writer = PdfWriter()
+            for data in pdfs:
+                writer.append(BytesIO(data))
+            writer.write(out)
+        else:
+            with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as archive:
+                for (pk, _), data in zip(jobs, pdfs):
+                    archive.writestr(f"receipt_{pk}.pdf", data)
+    return len(jobs)
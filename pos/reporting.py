@@ -0,0 +1,104 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from django.db.models import Sum, Count, Avg, Min, Max
+from django.utils import timezone
+from .models import Order
+from .timebuckets import in_local_days
+
+# Preset periods and how many days before today they start.
+PERIOD_DAYS = {"daily": 0, "weekly": 7, "monthly": 30}
+
+
+class SalesReport:
+    """Orders and summary figures for one reporting window.
+
+    Use ``SalesReport.from_params(request.GET)``; it understands either a
+    preset ``period`` (all/daily/weekly/monthly) or explicit ``start`` and
+    ``end`` dates (YYYY-MM-DD, inclusive). Invalid dates raise ``ValueError``.
+    """
+
+    def __init__(self, period="all", start_date=None, end_date=None, today=None):
+        self.today = today or timezone.localdate()
+        self.period = period
+        self.start_date = start_date
+        self.end_date = end_date or self.today
+        self._summary = None
+
+    @classmethod
+    def from_params(cls, params):
+        today = timezone.localdate()
+        start = params.get("start", "").strip()
+        end = params.get("end", "").strip()
+        if start or end:
+            start_date = date.fromisoformat(start) if start else None
+            end_date = date.fromisoformat(end) if end else today
+            if start_date and start_date > end_date:
+                raise ValueError("start must not be after end")
+            return cls("custom", start_date, end_date, today=today)
+
+        period = params.get("period", "all")
+        if period in PERIOD_DAYS:
+            start_date = today - timedelta(days=PERIOD_DAYS[period])
+            return cls(period, start_date, today, today=today)
+        return cls("all", None, today, today=today)
+
+    @property
+    def label(self):
+        """Short name for file names, e.g. ``weekly`` or ``20250101-20250131``."""
+        if self.period != "custom":
+            return self.period
+        start = self.start_date.strftime("%Y%m%d") if self.start_date else "awal"
+        return f"{start}-{self.end_date.strftime('%Y%m%d')}"
+
+    def query_params(self):
+        """Parameters that reproduce this window, for links and exports."""
+        if self.period != "custom":
+            return {"period": self.period}
+        params = {"end": self.end_date.isoformat()}
+        if self.start_date:
+            params["start"] = self.start_date.isoformat()
+        return params
+
+    @property
+    def orders(self):
+        """Orders in the window, newest first."""
+        qs = Order.objects.all()
+        if self.start_date or self.period == "custom":
+            qs = in_local_days(qs, self.start_date, self.end_date)
+        return qs.order_by("-created_at")
+
+    def iter_orders(self):
+        """Orders with customer names for the exporters, from a server-side cursor."""
+        return (
+            self.orders.select_related("customer")
+            .only("created_at", "total_price", "customer__name")
+            .iterator(chunk_size=2000)
+        )
+
+    def filename(self, extension):
+        """Download name, e.g. ``laporan_weekly_20250131.pdf``."""
+        return f'laporan_{self.label}_{self.today.strftime("%Y%m%d")}.{extension}'
+
+    def summary(self):
+        """Count, sum, average, min and max of order totals in one query."""
+        if self._summary is None:
+            stats = self.orders.order_by().aggregate(
+                total_orders=Count("id"),
+                total_sales=Sum("total_price"),
+                avg_sales=Avg("total_price"),
+                min_sale=Min("total_price"),
+                max_sale=Max("total_price"),
+                first_order_at=Min("created_at"),
+            )
+            for key in ("total_sales", "avg_sales", "min_sale", "max_sale"):
+                stats[key] = stats[key] or Decimal("0")
+            self._summary = stats
+        return self._summary
+
+    @property
+    def period_start(self):
+        """First day shown on exports; the first order's date if open-ended."""
+        if self.start_date:
+            return self.start_date
+        first = self.summary()["first_order_at"]
+        return timezone.localdate(first) if first else self.today
@@ -0,0 +1,256 @@
+import threading
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from django.db import transaction, IntegrityError
+from django.db.models import Sum, Count, F, Q, DecimalField, ExpressionWrapper
+from django.db.models.signals import post_delete, pre_delete
+from django.db.models.functions import TruncDate, ExtractHour
+from django.utils import timezone
+from .models import (
+    Order,
+    OrderItem,
+    DailySales,
+    HourlySales,
+    DailyCategorySales,
+    DailyProductSales,
+)
+from .timebuckets import day_bounds
+
+CENT = Decimal("0.01")
+
+# Revenue of one order line after its discount, times 100. Dividing after
+# the SUM keeps SQLite from truncating with integer division.
+LINE_REVENUE_X100 = ExpressionWrapper(
+    F("quantity") * F("price") * (100 - F("discount_percent")),
+    output_field=DecimalField(max_digits=16, decimal_places=2),
+)
+
+
+def _add(model, keys, **amounts):
+    """Add ``amounts`` to the ``model`` row identified by ``keys``.
+
+    One conditional UPDATE in the common case; the row is inserted when it
+    does not exist yet.
+    """
+    bump = {field: F(field) + value for field, value in amounts.items()}
+    if model.objects.filter(**keys).update(**bump):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**keys, **amounts)
+    except IntegrityError:
+        # Another till created the row between our UPDATE and INSERT.
+        model.objects.filter(**keys).update(**bump)
+
+
+def record_orders(pairs):
+    """Add ``(order, items)`` pairs to the sales rollup tables.
+
+    ``items`` are the order's ``OrderItem`` rows with ``product`` loaded.
+    Totals are summed per rollup row first, so a batch of orders costs one
+    ``_add`` per distinct day, hour, product and category. Call inside the
+    transaction that created the orders so the rollups and the orders
+    commit (or roll back) together.
+    """
+    daily = defaultdict(lambda: [Decimal("0"), 0])
+    hourly = defaultdict(lambda: [Decimal("0"), 0])
+    by_product = defaultdict(lambda: [0, Decimal("0")])
+    by_category = defaultdict(lambda: [0, Decimal("0")])
+    for order, items in pairs:
+        local = timezone.localtime(order.created_at)
+        day = local.date()
+        # A freshly created order still holds the unrounded total; round it
+        # the way the database stores it.
+        total = order.total_price.quantize(CENT)
+        for row in (daily[day], hourly[day, local.hour]):
+            row[0] += total
+            row[1] += 1
+
+        products = defaultdict(lambda: [0, Decimal("0")])
+        categories = defaultdict(lambda: [0, Decimal("0")])
+        for item in items:
+            revenue = item.subtotal()
+            products[item.product_id][0] += item.quantity
+            products[item.product_id][1] += revenue
+            if item.product.category_id:
+                categories[item.product.category_id][0] += item.quantity
+                categories[item.product.category_id][1] += revenue
+        for totals, lines in ((by_product, products), (by_category, categories)):
+            for key, (qty, revenue) in lines.items():
+                totals[day, key][0] += qty
+                totals[day, key][1] += revenue.quantize(CENT)
+
+    for day, (revenue, count) in sorted(daily.items()):
+        _add(DailySales, {"date": day}, revenue=revenue, order_count=count)
+    for (day, hour), (revenue, count) in sorted(hourly.items()):
+        _add(
+            HourlySales,
+            {"date": day, "hour": hour},
+            revenue=revenue,
+            order_count=count,
+        )
+    for (day, product_id), (qty, revenue) in sorted(by_product.items()):
+        _add(
+            DailyProductSales,
+            {"date": day, "product_id": product_id},
+            quantity=qty,
+            revenue=revenue,
+        )
+    for (day, category_id), (qty, revenue) in sorted(by_category.items()):
+        _add(
+            DailyCategorySales,
+            {"date": day, "category_id": category_id},
+            quantity=qty,
+            revenue=revenue,
+        )
+
+
+def record_order(order, items=None):
+    """``record_orders`` for one order; ``items`` default to a fresh query."""
+    if items is None:
+        items = order.items.select_related("product")
+    record_orders([(order, items)])
+
+
+# Local dates of orders being deleted, per thread, until they are recomputed.
+_deleted_days = threading.local()
+
+
+def _order_deleting(sender, instance, **kwargs):
+    days = getattr(_deleted_days, "days", None)
+    if days is None:
+        days = _deleted_days.days = set()
+    days.add(timezone.localtime(instance.created_at).date())
+
+
+def _order_deleted(sender, instance, **kwargs):
+    # Django deletes every collected order before the first post_delete, so
+    # the first one recomputes all affected days (still inside the deleting
+    # transaction) and the rest find nothing left to do. Recomputing rather
+    # than subtracting also copes with orders the rollups never counted.
+    days = getattr(_deleted_days, "days", None)
+    if days:
+        _deleted_days.days = None
+        rebuild(days)
+
+
+pre_delete.connect(_order_deleting, sender=Order, dispatch_uid="pos.rollups.deleting")
+post_delete.connect(_order_deleted, sender=Order, dispatch_uid="pos.rollups.deleted")
+
+
+def _day_window(days, field):
+    """``Q`` matching ``field`` on any of the local ``days``.
+
+    Consecutive days are merged into one range so the ``created_at`` index
+    still serves the filter.
+    """
+    window = Q()
+    days = sorted(days)
+    first = prev = days[0]
+    for day in days[1:] + [None]:
+        if day is not None and day == prev + timedelta(days=1):
+            prev = day
+            continue
+        start, end = day_bounds(first, prev)
+        window |= Q(**{f"{field}__gte": start, f"{field}__lt": end})
+        first = prev = day
+    return window
+
+
+def rebuild(days=None):
+    """Recompute the rollup tables from ``Order``/``OrderItem``.
+
+    ``days`` limits the work to those local dates (e.g. the days of deleted
+    orders); by default every row is rebuilt. Returns the number of
+    ``DailySales`` rows written.
+    """
+    orders = Order.objects.all()
+    lines = OrderItem.objects.all()
+    if days is not None:
+        if not days:
+            return 0
+        orders = orders.filter(_day_window(days, "created_at"))
+        lines = lines.filter(_day_window(days, "order__created_at"))
+
+    daily = (
+        orders.annotate(day=TruncDate("created_at"))
+        .values("day")
+        .annotate(revenue=Sum("total_price"), order_count=Count("id"))
+        .order_by("day")
+    )
+    hourly = (
+        orders.annotate(day=TruncDate("created_at"), hour=ExtractHour("created_at"))
+        .values("day", "hour")
+        .annotate(revenue=Sum("total_price"), order_count=Count("id"))
+        .order_by("day", "hour")
+    )
+    lines = lines.annotate(day=TruncDate("order__created_at"))
+    products = (
+        lines.values("day", "product_id")
+        .annotate(sales=Sum(LINE_REVENUE_X100), units=Sum("quantity"))
+        .order_by()
+    )
+    categories = (
+        lines.filter(product__category__isnull=False)
+        .values("day", category_id=F("product__category_id"))
+        .annotate(sales=Sum(LINE_REVENUE_X100), units=Sum("quantity"))
+        .order_by()
+    )
+
+    def money(value):
+        return Decimal(value or 0).quantize(CENT)
+
+    with transaction.atomic():
+        for model in (DailySales, HourlySales, DailyCategorySales, DailyProductSales):
+            stale = model.objects.all()
+            if days is not None:
+                stale = stale.filter(date__in=days)
+            stale.delete()
+        created = DailySales.objects.bulk_create(
+            [
+                DailySales(
+                    date=row["day"],
+                    revenue=money(row["revenue"]),
+                    order_count=row["order_count"],
+                )
+                for row in daily
+            ]
+        )
+        HourlySales.objects.bulk_create(
+            [
+                HourlySales(
+                    date=row["day"],
+                    hour=row["hour"],
+                    revenue=money(row["revenue"]),
+                    order_count=row["order_count"],
+                )
+                for row in hourly
+            ],
+            batch_size=1000,
+        )
+        DailyProductSales.objects.bulk_create(
+            [
+                DailyProductSales(
+                    date=row["day"],
+                    product_id=row["product_id"],
+                    quantity=row["units"],
+                    revenue=money(Decimal(row["sales"] or 0) / 100),
+                )
+                for row in products.iterator()
+            ],
+            batch_size=1000,
+        )
+        DailyCategorySales.objects.bulk_create(
+            [
+                DailyCategorySales(
+                    date=row["day"],
+                    category_id=row["category_id"],
+                    quantity=row["units"],
+                    revenue=money(Decimal(row["sales"] or 0) / 100),
+                )
+                for row in categories.iterator()
+            ],
+            batch_size=1000,
+        )
+    return len(created)
@@ -0,0 +1,275 @@
+"""Ranked full-text search for products, customers and suppliers.
+
+The backend follows the database:
+
+* SQLite: an FTS5 table per model (``pos_<model>_search``) using the model
+  table as external content, kept in sync by triggers and ranked with
+  ``bm25``.
+* PostgreSQL: a GIN index on a weighted ``tsvector`` expression plus a
+  ``pg_trgm`` index on the name, ranked by ``ts_rank`` + ``similarity`` so
+  typos still find something.
+* Anything else (or SQLite without FTS5): ``icontains`` on the same fields.
+
+Every query word is matched as a prefix, so "ind gor" finds "Indomie
+Goreng". ``install()`` creates the tables/indexes, ``rebuild()`` repopulates
+them (``manage.py rebuild_search_index``).
+
+On SQLite most ``AlterField``/``AddField`` operations copy the table,
+which drops its triggers. ``ensure()`` runs after every ``migrate`` (a
+``post_migrate`` receiver registered by ``PosConfig``) and puts missing
+structures back, reindexing only the tables that lost them, so migrations
+never need to call into this module.
+"""
+
+import re
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db import connection as default_connection
+from django.db.migrations.recorder import MigrationRecorder
+from django.db.models import Case, IntegerField, Q, When
+
+# kind -> (table, searchable columns, bm25 weight per column)
+INDEXES = {
+    "product": ("pos_product", ("name", "description"), (10.0, 1.0)),
+    "customer": ("pos_customer", ("name", "phone"), (10.0, 5.0)),
+    "supplier": (
+        "pos_supplier",
+        ("name", "contact_person", "phone", "email"),
+        (10.0, 5.0, 3.0, 3.0),
+    ),
+}
+
+# Upper bound on ranked hits fed back into the ORM queryset.
+MAX_RESULTS = 1000
+
+_available = {}
+
+
+def _terms(query):
+    return re.findall(r"\w+", query.lower())
+
+
+def backend(connection=default_connection):
+    """``"fts5"``, ``"postgres"`` or ``"like"`` for ``connection``."""
+    if connection.vendor == "postgresql":
+        return "postgres"
+    if connection.vendor == "sqlite":
+        if connection.alias not in _available:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT 1 FROM sqlite_master WHERE name = %s",
+                    [INDEXES["product"][0] + "_search"],
+                )
+                _available[connection.alias] = cursor.fetchone() is not None
+        if _available[connection.alias]:
+            return "fts5"
+    return "like"
+
+
+def _pg_vector(columns):
+    weights = "ABCD"
+    return " || ".join(
+        f"setweight(to_tsvector('simple', coalesce({column}, '')), "
+        f"'{weights[min(i, 3)]}')"
+        for i, column in enumerate(columns)
+    )
+
+
+def install_sql(vendor, fts5=True):
+    """DDL creating the search structures for ``vendor``."""
+    statements = []
+    if vendor == "sqlite" and fts5:
+        for table, columns, _ in INDEXES.values():
+            fts = f"{table}_search"
+            cols = ", ".join(columns)
+            new = ", ".join(f"new.{c}" for c in columns)
+            old = ", ".join(f"old.{c}" for c in columns)
+            statements += [
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({cols}, "
+                f"content='{table}', content_rowid='id', "
+                f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+                f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END",
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, {cols}) "
+                f"VALUES ('delete', old.id, {old}); END",
+                # Only text changes touch the index, not e.g. stock updates.
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_au "
+                f"AFTER UPDATE OF {cols} ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, {cols}) "
+                f"VALUES ('delete', old.id, {old}); "
+                f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END",
+            ]
+    elif vendor == "postgresql":
+        statements.append("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for table, columns, _ in INDEXES.values():
+            statements += [
+                f"CREATE INDEX IF NOT EXISTS {table}_search_fts "
+                f"ON {table} USING gin (({_pg_vector(columns)}))",
+                f"CREATE INDEX IF NOT EXISTS {table}_search_trgm "
+                f"ON {table} USING gin (name gin_trgm_ops)",
+            ]
+    return statements
+
+
+def uninstall_sql(vendor):
+    statements = []
+    for table, _, _ in INDEXES.values():
+        if vendor == "sqlite":
+            statements.append(f"DROP TABLE IF EXISTS {table}_search")
+            statements += [
+                f"DROP TRIGGER IF EXISTS {table}_search_{suffix}"
+                for suffix in ("ai", "ad", "au")
+            ]
+        elif vendor == "postgresql":
+            statements += [
+                f"DROP INDEX IF EXISTS {table}_search_fts",
+                f"DROP INDEX IF EXISTS {table}_search_trgm",
+            ]
+    return statements
+
+
+def _has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        if cursor.fetchone()[0]:
+            return True
+        # Some builds ship FTS5 without reporting the compile option.
+        try:
+            cursor.execute("CREATE VIRTUAL TABLE temp._fts5_probe USING fts5(x)")
+            cursor.execute("DROP TABLE temp._fts5_probe")
+            return True
+        except Exception:
+            return False
+
+
+def install(connection=default_connection):
+    """Create the search structures if missing. Returns the backend in use."""
+    fts5 = connection.vendor == "sqlite" and _has_fts5(connection)
+    with connection.cursor() as cursor:
+        for statement in install_sql(connection.vendor, fts5=fts5):
+            cursor.execute(statement)
+    _available.pop(connection.alias, None)
+    return backend(connection)
+
+
+def uninstall(connection=default_connection):
+    with connection.cursor() as cursor:
+        for statement in uninstall_sql(connection.vendor):
+            cursor.execute(statement)
+    _available.pop(connection.alias, None)
+
+
+def rebuild(connection=default_connection):
+    """Repopulate every search index from its table. Returns the backend."""
+    kind = install(connection)
+    with connection.cursor() as cursor:
+        for table, _, _ in INDEXES.values():
+            if kind == "fts5":
+                fts = f"{table}_search"
+                cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+                cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('optimize')")
+            elif kind == "postgres":
+                cursor.execute(f"REINDEX INDEX {table}_search_fts")
+                cursor.execute(f"REINDEX INDEX {table}_search_trgm")
+    return kind
+
+
+def ensure(connection=default_connection):
+    """Install whatever search structures are missing. Returns the backend.
+
+    Idempotent and cheap when nothing is missing. On SQLite a table whose
+    FTS table or triggers had to be (re)created is reindexed, since rows
+    written meanwhile never reached the index.
+    """
+    if connection.vendor != "sqlite":
+        # CREATE INDEX IF NOT EXISTS builds a complete index when missing.
+        return install(connection)
+    if not _has_fts5(connection):
+        return backend(connection)
+    names = {
+        table: {f"{table}_search"}
+        | {f"{table}_search_{suffix}" for suffix in ("ai", "ad", "au")}
+        for table, _, _ in INDEXES.values()
+    }
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')"
+        )
+        present = {row[0] for row in cursor.fetchall()}
+    stale = [table for table, wanted in names.items() if not wanted <= present]
+    if not stale:
+        return backend(connection)
+    kind = install(connection)
+    with connection.cursor() as cursor:
+        for table in stale:
+            fts = f"{table}_search"
+            cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+    return kind
+
+
+def ensure_after_migrate(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    """``post_migrate`` receiver: ``ensure()`` once migration 0012 is applied."""
+    connection = connections[using]
+    applied = MigrationRecorder(connection).applied_migrations()
+    if ("pos", "0012_search_index") in applied:
+        ensure(connection)
+
+
+def search_ids(kind, query, limit=MAX_RESULTS, connection=default_connection):
+    """Primary keys of ``kind`` rows matching ``query``, best match first.
+
+    Returns None when the database has no full-text index (use
+    ``filter_queryset``, which falls back to ``icontains``).
+    """
+    table, columns, weights = INDEXES[kind]
+    terms = _terms(query)
+    if not terms:
+        return []
+    engine = backend(connection)
+    if engine == "fts5":
+        fts = f"{table}_search"
+        match = " ".join(f'"{term}"*' for term in terms)
+        sql = (
+            f"SELECT rowid FROM {fts} WHERE {fts} MATCH %s "
+            f"ORDER BY bm25({fts}, {', '.join(map(str, weights))}) LIMIT %s"
+        )
+        params = [match, limit]
+    elif engine == "postgres":
+        vector = _pg_vector(columns)
+        tsquery = " & ".join(f"{term}:*" for term in terms)
+        sql = (
+            f"SELECT id FROM {table} "
+            f"WHERE ({vector}) @@ to_tsquery('simple', %s) OR name %% %s "
+            f"ORDER BY ts_rank(({vector}), to_tsquery('simple', %s)) "
+            f"+ similarity(name, %s) DESC LIMIT %s"
+        )
+        params = [tsquery, query, tsquery, query, limit]
+    else:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def filter_queryset(queryset, kind, query, field="pk"):
+    """Restrict ``queryset`` to ``kind`` rows matching ``query``.
+
+    With ``field="pk"`` the result is ordered by rank; pass e.g.
+    ``field="customer_id"`` to filter a related model by the matches.
+    """
+    ids = search_ids(kind, query)
+    if ids is None:
+        _, columns, _ = INDEXES[kind]
+        prefix = "" if field == "pk" else field[: -len("_id")] + "__"
+        match = Q()
+        for column in columns:
+            match |= Q(**{f"{prefix}{column}__icontains": query})
+        return queryset.filter(match)
+    queryset = queryset.filter(**{f"{field}__in": ids})
+    if field == "pk" and ids:
+        rank = Case(
+            *[When(pk=pk, then=i) for i, pk in enumerate(ids)],
+            output_field=IntegerField(),
+        )
+        queryset = queryset.order_by(rank)
+    return queryset
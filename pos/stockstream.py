@@ -0,0 +1,310 @@
+"""Live stock changes pushed to tills over Server-Sent Events.
+
+Checkout (``order_create``, ``api_create_order``, batch sync) and product
+saves (e.g. ``purchase_order_receive``) publish ``{"id", "stock", "seq"}``
+once their transaction commits. ``broker`` fans every event out to the SSE
+connections of this process; each connection is one asyncio queue waiting
+in the ASGI event loop, so idle tills hold no thread and run no query.
+
+``mini_pos/asgi.py`` routes ``STREAM_PATH`` to ``sse_app``, a bare ASGI app,
+because Django 4.2 does not notice when a streaming client goes away.
+Clients that reconnect with ``Last-Event-ID`` (the change ``seq``) get the
+stock changes they missed from ``pos.changefeed``, or a ``resync`` event
+if the gap is too long.
+
+STOCK_STREAM_BACKEND picks how events reach the broker:
+
+* ``LocalBackend`` (default) delivers in-process: enough when one ASGI
+  process serves both the pages and the stream.
+* ``PostgresBackend`` sends ``NOTIFY pos_stock`` and each process LISTENs
+  on a background thread, so WSGI and ASGI workers share one stream.
+
+Any class taking a ``deliver`` callback and providing ``start()`` and
+``publish(events)`` can be plugged in the same way.
+"""
+
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from http.cookies import SimpleCookie
+from importlib import import_module
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.db.models.signals import post_delete, post_save
+from django.http import HttpRequest, HttpResponseForbidden
+from django.utils.module_loading import import_string
+from . import apikeys, changefeed
+from .models import ApiKey, Product
+
+logger = logging.getLogger(__name__)
+
+STREAM_PATH = "/api/stock/stream/"
+
+# Changes replayed to a reconnecting client before asking it to resync.
+REPLAY_LIMIT = 500
+
+
+class LocalBackend:
+    def __init__(self, deliver):
+        self.deliver = deliver
+
+    def start(self):
+        pass
+
+    def publish(self, events):
+        self.deliver(events)
+
+
+class PostgresBackend:
+    CHANNEL = "pos_stock"
+
+    def __init__(self, deliver):
+        self.deliver = deliver
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._listen, name="pos-stockstream", daemon=True
+                )
+                self._thread.start()
+
+    def publish(self, events):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_notify(%s, %s)", [self.CHANNEL, json.dumps(events)]
+            )
+
+    def _listen(self):
+        import psycopg2
+
+        while True:
+            try:
+                conn = psycopg2.connect(**connections["default"].get_connection_params())
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f"LISTEN {self.CHANNEL}")
+                while True:
+                    if select.select([conn], [], [], 60)[0]:
+                        conn.poll()
+                        while conn.notifies:
+                            self.deliver(json.loads(conn.notifies.pop(0).payload))
+            except Exception:
+                logger.exception("Stock stream listener failed, reconnecting")
+                time.sleep(5)
+
+
+class Subscription:
+    """One SSE connection: a bounded queue owned by its event loop."""
+
+    def __init__(self, loop, maxsize):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize)
+
+    def push(self, events):
+        # Runs in the subscriber's loop (via call_soon_threadsafe).
+        for event in events:
+            try:
+                self.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Too slow to keep up: end the stream; the client reconnects
+                # with Last-Event-ID and catches up from the change feed.
+                while not self.queue.empty():
+                    self.queue.get_nowait()
+                self.queue.put_nowait(None)
+                return
+
+
+class Broker:
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._backend = None
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = import_string(settings.STOCK_STREAM_BACKEND)(self.deliver)
+        return self._backend
+
+    def publish(self, events):
+        if events:
+            self.backend.publish(events)
+
+    def subscribe(self):
+        self.backend.start()
+        sub = Subscription(asyncio.get_running_loop(), settings.STOCK_STREAM_QUEUE)
+        with self._lock:
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def deliver(self, events):
+        """Hand ``events`` to every subscriber; safe from any thread."""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            try:
+                sub.loop.call_soon_threadsafe(sub.push, events)
+            except RuntimeError:  # loop closed
+                self.unsubscribe(sub)
+
+
+broker = Broker()
+
+
+def publish_stock(rows):
+    """Publish ``(product_id, stock, seq)`` rows after the current commit."""
+    events = [{"id": pid, "stock": stock, "seq": seq} for pid, stock, seq in rows]
+    transaction.on_commit(lambda: broker.publish(events))
+
+
+def _product_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        publish_stock([(instance.pk, instance.stock, instance.change_seq)])
+
+
+def _product_deleted(sender, instance, **kwargs):
+    event = {"id": instance.pk, "deleted": True, "seq": instance.change_seq}
+    transaction.on_commit(lambda: broker.publish([event]))
+
+
+# Connected after pos.changefeed's receivers, which set change_seq.
+post_save.connect(_product_saved, sender=Product, dispatch_uid="pos.stockstream.save")
+post_delete.connect(
+    _product_deleted, sender=Product, dispatch_uid="pos.stockstream.delete"
+)
+
+
+def format_event(event):
+    data = json.dumps(event, separators=(",", ":"))
+    if event.get("resync"):
+        return f"event: resync\ndata: {data}\n\n".encode()
+    return f"id: {event['seq']}\nevent: stock\ndata: {data}\n\n".encode()
+
+
+def replay(since):
+    """Stock events after change ``since``, for a reconnecting client."""
+    changes, next_since, has_more = changefeed.changes_since(since, REPLAY_LIMIT)
+    events = [
+        {"id": c["id"], "deleted": True, "seq": c["seq"]}
+        if c["deleted"]
+        else {"id": c["id"], "stock": c["stock"], "seq": c["seq"]}
+        for c in changes
+    ]
+    if has_more:
+        # Tell the till to catch up through /api/products/changes/ instead.
+        events.append({"resync": True, "since": next_since})
+    return events
+
+
+def _refusal(headers):
+    """None if the connection may subscribe, else the ``HttpResponse`` to send."""
+    raw = headers.get(b"x-api-key", b"").decode()
+    if raw:
+        # Checked (and rate limited) per connection, not per event.
+        return apikeys.verdict(apikeys.authenticate(raw), ApiKey.SCOPE_READ)
+    # Logged-in browsers (the order page) authenticate with their session.
+    cookie = SimpleCookie(headers.get(b"cookie", b"").decode())
+    morsel = cookie.get(settings.SESSION_COOKIE_NAME)
+    if morsel is not None:
+        from django.contrib.auth import get_user
+
+        # get_user() also checks the session's password hash, so sessions
+        # ended by a password change are refused here too.
+        request = HttpRequest()
+        request.session = import_module(settings.SESSION_ENGINE).SessionStore(
+            morsel.value
+        )
+        if get_user(request).is_authenticated:
+            return None
+    return HttpResponseForbidden("Invalid or missing API key or session")
+
+
+async def _send_status(send, status, text, headers=()):
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"text/plain; charset=utf-8"), *headers],
+        }
+    )
+    await send({"type": "http.response.body", "body": text.encode()})
+
+
+async def _wait_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def sse_app(scope, receive, send):
+    """ASGI app serving ``text/event-stream`` of stock changes."""
+    if scope["method"] != "GET":
+        return await _send_status(send, 405, "Method not allowed")
+    headers = dict(scope["headers"])
+    refusal = await sync_to_async(_refusal)(headers)
+    if refusal is not None:
+        # 403 for a bad key or session, 429 + Retry-After for a throttled key.
+        extra = [
+            (name.lower().encode(), value.encode())
+            for name, value in refusal.items()
+            if name.lower() == "retry-after"
+        ]
+        return await _send_status(
+            send, refusal.status_code, refusal.content.decode(), extra
+        )
+
+    sub = broker.subscribe()
+    disconnected = asyncio.ensure_future(_wait_disconnect(receive))
+    try:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/event-stream"),
+                    (b"cache-control", b"no-cache"),
+                    (b"x-accel-buffering", b"no"),
+                ],
+            }
+        )
+
+        async def write(chunk):
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+
+        await write(b"retry: 3000\n\n")
+        last_id = headers.get(b"last-event-id", b"").decode()
+        if last_id.isdigit():
+            for event in await sync_to_async(replay)(int(last_id)):
+                await write(format_event(event))
+
+        while True:
+            getter = asyncio.ensure_future(sub.queue.get())
+            done, _ = await asyncio.wait(
+                {getter, disconnected},
+                timeout=settings.STOCK_STREAM_HEARTBEAT,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if getter not in done:
+                getter.cancel()
+                if disconnected in done:
+                    return
+                await write(b": ping\n\n")  # keeps proxies from timing out
+                continue
+            event = getter.result()
+            if event is None:
+                break
+            await write(format_event(event))
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        disconnected.cancel()
+        broker.unsubscribe(sub)
@@ -0,0 +1,125 @@
+"""Per-process prefix index over product names for till autocomplete.
+
+Every word of every product name (plus the whole name) is stored in one
+sorted list of ``(key, product_id)`` pairs, so all products with a word
+starting with the query are one ``bisect`` range away. Further query words
+narrow the candidates down in memory.
+
+The index is marked stale by the ``Product`` save/delete signals of this
+process and rebuilt lazily on the next lookup. Other processes pick up
+changes after at most SUGGEST_INDEX_TTL seconds. Price and stock change at
+every sale, so they are not kept here; callers read them for the few hits.
+"""
+
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from .models import Product
+
+_WORD = re.compile(r"\w+")
+
+
+def normalize(text):
+    """Lowercase ``text`` and strip accents, so "Café" matches "cafe"."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+class PrefixIndex:
+    def __init__(self, products):
+        """``products`` is an iterable of ``(id, name)``."""
+        self.names = {}
+        self.normalized = {}
+        pairs = []
+        for pk, name in products:
+            norm = normalize(name)
+            self.names[pk] = name
+            self.normalized[pk] = norm
+            pairs.append((norm, pk))
+            for word in set(_WORD.findall(norm)):
+                pairs.append((word, pk))
+        pairs.sort()
+        self.keys = [key for key, _ in pairs]
+        self.ids = [pk for _, pk in pairs]
+        self.built_at = time.monotonic()
+
+    def _prefixed(self, prefix):
+        """Product ids with a name or word starting with ``prefix``."""
+        found = set()
+        i = bisect_left(self.keys, prefix)
+        while i < len(self.keys) and self.keys[i].startswith(prefix):
+            found.add(self.ids[i])
+            i += 1
+        return found
+
+    def lookup(self, query, limit=20):
+        """``[(id, name)]`` for products matching every word of ``query``.
+
+        Names that start with the whole query come first, then alphabetical.
+        """
+        norm = normalize(query).strip()
+        words = _WORD.findall(norm)
+        if not words:
+            return []
+        # Start from the rarest-looking (longest) word to keep the set small.
+        words.sort(key=len, reverse=True)
+        candidates = self._prefixed(words[0])
+        for word in words[1:]:
+            if not candidates:
+                break
+            candidates &= self._prefixed(word)
+        normalized = self.normalized
+        ranked = heapq.nsmallest(
+            limit,
+            candidates,
+            key=lambda pk: (not normalized[pk].startswith(norm), normalized[pk]),
+        )
+        return [(pk, self.names[pk]) for pk in ranked]
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def get_index():
+    """The current index, rebuilt if it is stale or older than the TTL."""
+    global _index
+    index = _index
+    if index is None or time.monotonic() - index.built_at > settings.SUGGEST_INDEX_TTL:
+        with _lock:
+            if _index is index:
+                _index = PrefixIndex(Product.objects.values_list("id", "name"))
+            index = _index
+    return index
+
+
+def invalidate(**kwargs):
+    global _index
+    _index = None
+
+
+def suggest(query, limit=20):
+    """Matching products as dicts with current price and stock."""
+    hits = get_index().lookup(query, limit)
+    if not hits:
+        return []
+    live = Product.objects.in_bulk([pk for pk, _ in hits])
+    return [
+        {
+            "id": pk,
+            "name": live[pk].name,
+            "price": str(live[pk].price),
+            "stock": live[pk].stock,
+        }
+        for pk, _ in hits
+        if pk in live
+    ]
+
+
+post_save.connect(invalidate, sender=Product, dispatch_uid="pos.suggest.save")
+post_delete.connect(invalidate, sender=Product, dispatch_uid="pos.suggest.delete")
@@ -0,0 +1,263 @@
+import re
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction, OperationalError
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from . import apikeys, rollups, search, stockstream
+from .checkout import place_order, InsufficientStock
+from .models import (
+    ApiKey,
+    Category,
+    Customer,
+    DailyCategorySales,
+    DailyProductSales,
+    DailySales,
+    HourlySales,
+    Order,
+    OrderItem,
+    Product,
+)
+from .reporting import SalesReport
+from .timebuckets import day_bounds, hour_bounds, in_range, month_bounds, week_bounds
+
+ROLLUP_MODELS = (DailySales, HourlySales, DailyCategorySales, DailyProductSales)
+
+
+class CheckoutConcurrencyTests(TransactionTestCase):
+    """Parallel tills against one product must never oversell it."""
+
+    WORKERS = 8
+    ATTEMPTS = 10
+    STOCK = 25
+
+    def test_parallel_checkouts_never_oversell(self):
+        customer = Customer.objects.create(name="Stress Test")
+        product = Product.objects.create(
+            name="Stress Test Product", price=1000, stock=self.STOCK
+        )
+
+        lock = threading.Lock()
+        stats = {"sold": 0, "rejected": 0, "errors": 0}
+        barrier = threading.Barrier(self.WORKERS)
+
+        def writer():
+            barrier.wait()
+            try:
+                for _ in range(self.ATTEMPTS):
+                    try:
+                        place_order(customer, [(product.pk, 1, 0)])
+                        key = "sold"
+                    except InsufficientStock:
+                        key = "rejected"
+                    except OperationalError:
+                        # e.g. SQLite "database is locked" under heavy contention
+                        key = "errors"
+                    with lock:
+                        stats[key] += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=writer) for _ in range(self.WORKERS)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        product.refresh_from_db()
+        self.assertEqual(sum(stats.values()), self.WORKERS * self.ATTEMPTS)
+        self.assertGreater(stats["sold"], 0)
+        self.assertLessEqual(stats["sold"], self.STOCK)
+        self.assertEqual(product.stock, self.STOCK - stats["sold"])
+        self.assertEqual(Order.objects.filter(customer=customer).count(), stats["sold"])
+
+
+class RollupDeleteTests(TestCase):
+    """Deleting orders leaves the rollups equal to a full rebuild."""
+
+    def setUp(self):
+        self.food = Category.objects.create(name="Makanan")
+        self.drink = Category.objects.create(name="Minuman")
+        self.product = Product.objects.create(
+            name="Teh Botol", category=self.food, price=Decimal("5000"), stock=100
+        )
+        self.keep = Customer.objects.create(name="Tetap")
+        self.leave = Customer.objects.create(name="Dihapus")
+        place_order(self.keep, [(self.product.pk, 2, 0)])
+
+    def snapshot(self):
+        return {
+            model.__name__: sorted(
+                model.objects.values_list(
+                    *[f.attname for f in model._meta.fields if f.name != "id"]
+                )
+            )
+            for model in ROLLUP_MODELS
+        }
+
+    def assertRollupsRebuilt(self):
+        live = self.snapshot()
+        rollups.rebuild()
+        self.assertEqual(live, self.snapshot())
+
+    def test_recategorised_product(self):
+        place_order(self.leave, [(self.product.pk, 3, 10)])
+        Product.objects.filter(pk=self.product.pk).update(category=self.drink)
+        self.leave.delete()
+        # The affected day is recomputed, so the remaining sale now counts
+        # under the product's current category, as after rebuild_rollups.
+        self.assertEqual(
+            list(DailyCategorySales.objects.values_list("category", "quantity")),
+            [(self.drink.pk, 2)],
+        )
+        self.assertRollupsRebuilt()
+
+    def test_orders_never_counted(self):
+        # e.g. orders from before the rollup tables, or benchmark rows
+        orders = Order.objects.bulk_create(
+            [Order(customer=self.leave, total_price=Decimal("5000")) for _ in range(5)]
+        )
+        OrderItem.objects.bulk_create(
+            [
+                OrderItem(order=order, product=self.product, quantity=1, price=5000)
+                for order in orders
+            ]
+        )
+        self.leave.delete()
+        self.assertEqual(DailySales.objects.get().order_count, 1)
+        self.assertRollupsRebuilt()
+
+
+# created_at wrapped in a date/extract function (SQLite and PostgreSQL forms)
+FUNCTION_WRAP = re.compile(
+    r'django_datetime_\w+\(\s*"\w+"\."created_at"'
+    r'|"created_at"\s+AT TIME ZONE'
+    r'|EXTRACT\([^)]*"created_at"',
+    re.IGNORECASE,
+)
+ORDER_INDEX = "pos_order_created_id_idx"
+
+
+class QueryPlanTests(TestCase):
+    """Local-time order filters must stay index-friendly.
+
+    The SQL must not wrap ``created_at`` in a function, and EXPLAIN must
+    show the ``created_at`` index.
+    """
+
+    def querysets(self):
+        now = timezone.localtime()
+        today = now.date()
+        orders = Order.objects.all()
+        return [
+            ("hari ini", in_range(orders, *day_bounds(today))),
+            ("jam ini", in_range(orders, *hour_bounds(today, now.hour))),
+            ("minggu ini", in_range(orders, *week_bounds(today))),
+            ("bulan ini", in_range(orders, *month_bounds(today))),
+            ("laporan mingguan", SalesReport.from_params({"period": "weekly"}).orders),
+            (
+                "laporan kustom",
+                SalesReport.from_params(
+                    {
+                        "start": (today - timedelta(days=30)).isoformat(),
+                        "end": today.isoformat(),
+                    }
+                ).orders,
+            ),
+            (
+                "laporan s/d tanggal",
+                SalesReport.from_params({"end": today.isoformat()}).orders,
+            ),
+        ]
+
+    def explain(self, queryset):
+        with transaction.atomic():
+            if connection.vendor == "postgresql":
+                # Small test tables make a sequential scan look cheaper; ask
+                # whether the index *can* serve the filter.
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL enable_seqscan = off")
+            return queryset.explain()
+
+    def test_filters_use_created_at_index(self):
+        for label, queryset in self.querysets():
+            with self.subTest(label):
+                with self.assertNumQueries(1) as ctx:
+                    list(queryset[:1])
+                sql = ctx.captured_queries[0]["sql"]
+                self.assertIsNone(FUNCTION_WRAP.search(sql), sql)
+                self.assertIn(ORDER_INDEX, self.explain(queryset))
+
+    def test_report_rows_take_one_query(self):
+        customer = Customer.objects.create(name="Laporan")
+        for _ in range(3):
+            Order.objects.create(customer=customer, total_price=Decimal("1000"))
+        report = SalesReport.from_params({"period": "weekly"})
+        with self.assertNumQueries(1):
+            names = [order.customer.name for order in report.iter_orders()]
+        self.assertEqual(names, ["Laporan"] * 3)
+
+
+class SearchIndexTests(TestCase):
+    """``search.ensure()`` repairs what table-copying migrations drop."""
+
+    def setUp(self):
+        if search.backend(connection) != "fts5":
+            self.skipTest("needs SQLite with FTS5")
+
+    def test_missing_trigger_is_restored_and_reindexed(self):
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER pos_product_search_ai")
+        product = Product.objects.create(name="Kopi Kapal Api", price=1500, stock=1)
+        self.assertNotIn(product.pk, search.search_ids("product", "kapal"))
+        self.assertEqual(search.ensure(connection), "fts5")
+        self.assertIn(product.pk, search.search_ids("product", "kapal"))
+        Product.objects.create(name="Kapal Selam", price=1000, stock=1)
+        self.assertEqual(len(search.search_ids("product", "kapal")), 2)
+
+
+class StockStreamAuthTests(TestCase):
+    """Who may open ``/api/stock/stream/`` and what the others get back."""
+
+    def open_stream(self, headers):
+        sent = []
+
+        async def receive():
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": "GET", "headers": headers}
+        async_to_sync(stockstream.sse_app)(scope, receive, send)
+        return sent[0]["status"], dict(sent[0]["headers"])
+
+    def test_throttled_key_gets_429(self):
+        raw, prefix, key_hash = apikeys.generate()
+        ApiKey.objects.create(
+            name="Kasir", prefix=prefix, key_hash=key_hash, rate=0, burst=1
+        )
+        headers = [(b"x-api-key", raw.encode())]
+        self.assertIsNone(stockstream._refusal(dict(headers)))
+        status, response_headers = self.open_stream(headers)
+        self.assertEqual(status, 429)
+        self.assertIn(b"retry-after", response_headers)
+
+    def test_unknown_key_gets_403(self):
+        status, _ = self.open_stream([(b"x-api-key", b"bukan-key")])
+        self.assertEqual(status, 403)
+
+    def test_session_ends_with_password_change(self):
+        user = get_user_model().objects.create_user("kasir", password="rahasia-1")
+        self.client.force_login(user)
+        cookie = f"{settings.SESSION_COOKIE_NAME}="
+        cookie += self.client.cookies[settings.SESSION_COOKIE_NAME].value
+        headers = {b"cookie": cookie.encode()}
+        self.assertIsNone(stockstream._refusal(headers))
+        user.set_password("rahasia-2")
+        user.save()
+        self.assertEqual(stockstream._refusal(headers).status_code, 403)
@@ -0,0 +1,71 @@
+"""Shop-local calendar buckets as half-open ``[start, end)`` datetime ranges.
+
+``created_at__date=day`` or ``created_at__hour=h`` wraps the column in a
+function: the database cannot use the ``created_at`` index, and the bucket
+follows the database session's zone instead of the shop's TIME_ZONE. Filter
+on the bounds returned here instead, e.g.::
+
+    start, end = day_bounds(today)
+    Order.objects.filter(created_at__gte=start, created_at__lt=end)
+
+or ``in_range(Order.objects.all(), *week_bounds(today))``. Every bound is
+a local midnight (or hour) made aware in the current time zone, so days
+stay correct across DST changes.
+"""
+
+from datetime import datetime, time, timedelta
+from django.utils import timezone
+
+
+def local_start(day, hour=0):
+    """Aware datetime for ``hour``:00 local time on ``day``."""
+    return timezone.make_aware(
+        datetime.combine(day, time(hour)), timezone.get_current_timezone()
+    )
+
+
+def day_bounds(start_date, end_date=None):
+    """Bounds covering the whole local days ``start_date`` to ``end_date``."""
+    end_date = end_date or start_date
+    return local_start(start_date), local_start(end_date + timedelta(days=1))
+
+
+def hour_bounds(day, hour):
+    """Bounds of one local clock hour."""
+    start = local_start(day, hour)
+    if hour == 23:
+        return start, local_start(day + timedelta(days=1))
+    return start, local_start(day, hour + 1)
+
+
+def week_bounds(day):
+    """Bounds of the local Monday-to-Sunday week containing ``day``."""
+    monday = day - timedelta(days=day.weekday())
+    return day_bounds(monday, monday + timedelta(days=6))
+
+
+def month_bounds(day):
+    """Bounds of the local calendar month containing ``day``."""
+    first = day.replace(day=1)
+    next_month = (first + timedelta(days=32)).replace(day=1)
+    return local_start(first), local_start(next_month)
+
+
+def in_range(queryset, start, end, field="created_at"):
+    """Filter ``queryset`` to ``start <= field < end``; either bound may be None."""
+    if start is not None:
+        queryset = queryset.filter(**{f"{field}__gte": start})
+    if end is not None:
+        queryset = queryset.filter(**{f"{field}__lt": end})
+    return queryset
+
+
+def in_local_days(queryset, start_date, end_date=None, field="created_at"):
+    """Filter ``queryset`` to rows whose ``field`` falls on the given local days.
+
+    ``start_date`` may be None for an open start.
+    """
+    end_date = end_date or start_date
+    _, end = day_bounds(end_date)
+    start = local_start(start_date) if start_date else None
+    return in_range(queryset, start, end, field)
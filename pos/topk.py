@@ -0,0 +1,202 @@
+"""Live best sellers per day and per hour from a Space-Saving sketch.
+
+Checkout feeds every committed order line into ``best_sellers``; the
+"terlaris hari ini / jam ini" widget then reads the top products straight
+from memory in O(K), without a ``GROUP BY`` over ``OrderItem``.
+
+Each process keeps a sketch per current day and hour. What it has counted
+since its last flush is merged into ``TopSellerSnapshot`` every
+TOPK_FLUSH_INTERVAL seconds, and the in-memory view is reloaded from that
+row at the same rate, so web workers converge on the same ranking. Counts
+not yet flushed when a process stops are lost; the ranking is an estimate
+by design (see ``SpaceSaving``).
+"""
+
+import threading
+import time
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+from .models import TopSellerSnapshot
+
+SCOPES = ("day", "hour")
+
+
+class SpaceSaving:
+    """Weighted Space-Saving sketch (Metwally et al.) over at most ``capacity`` keys.
+
+    ``counters`` maps a key to ``[count, error, label]``. A key's count
+    overestimates its true total by at most ``error``, and any item whose
+    true total exceeds ``total / capacity`` is guaranteed to be tracked.
+    """
+
+    def __init__(self, capacity, counters=None):
+        self.capacity = capacity
+        self.counters = counters if counters is not None else {}
+
+    def offer(self, key, weight=1, label=None):
+        entry = self.counters.get(key)
+        if entry is not None:
+            entry[0] += weight
+            if label:
+                entry[2] = label
+        elif len(self.counters) < self.capacity:
+            self.counters[key] = [weight, 0, label]
+        else:
+            # Replace the smallest counter; the newcomer inherits its count
+            # as the error bound.
+            victim = min(self.counters, key=lambda k: self.counters[k][0])
+            floor = self.counters.pop(victim)[0]
+            self.counters[key] = [floor + weight, floor, label]
+
+    def floor(self):
+        """Upper bound for the count of any key that is not tracked."""
+        if len(self.counters) < self.capacity:
+            return 0
+        return min(entry[0] for entry in self.counters.values())
+
+    def merge(self, other):
+        """Return a new sketch summarising both inputs."""
+        floor_a, floor_b = self.floor(), other.floor()
+        merged = {}
+        for key in self.counters.keys() | other.counters.keys():
+            a = self.counters.get(key, [floor_a, floor_a, None])
+            b = other.counters.get(key, [floor_b, floor_b, None])
+            merged[key] = [a[0] + b[0], a[1] + b[1], b[2] or a[2]]
+        capacity = max(self.capacity, other.capacity)
+        keep = sorted(merged, key=lambda k: merged[k][0], reverse=True)[:capacity]
+        return SpaceSaving(capacity, {key: merged[key] for key in keep})
+
+    def top(self, n=5):
+        """The ``n`` heaviest keys as dicts, heaviest first."""
+        ranked = sorted(
+            self.counters.items(), key=lambda item: item[1][0], reverse=True
+        )[:n]
+        return [
+            {"product_id": key, "name": label, "quantity": count, "error": error}
+            for key, (count, error, label) in ranked
+        ]
+
+    def to_dict(self):
+        return {
+            "capacity": self.capacity,
+            "counters": [[key, *entry] for key, entry in self.counters.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, data, capacity):
+        counters = {
+            key: [count, error, label]
+            for key, count, error, label in data.get("counters", [])
+        }
+        return cls(data.get("capacity", capacity), counters)
+
+
+def current_periods(when=None):
+    """``{scope: period}`` for the local day and hour containing ``when``."""
+    local = timezone.localtime(when)
+    return {
+        "day": local.strftime("%Y-%m-%d"),
+        "hour": local.strftime("%Y-%m-%dT%H"),
+    }
+
+
+class BestSellers:
+    """Per-process sketches for the current day and hour."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}  # (scope, period) -> SpaceSaving incl. other workers
+        self._loaded_at = {}  # (scope, period) -> monotonic time of last load
+        self._pending = {}  # (scope, period) -> SpaceSaving not yet flushed
+        self._last_flush = time.monotonic()
+
+    def _new(self):
+        return SpaceSaving(settings.TOPK_CAPACITY)
+
+    def record(self, order, items):
+        """Count ``order``'s lines (with ``product`` loaded). Call after commit."""
+        periods = current_periods(order.created_at)
+        with self._lock:
+            for scope, period in periods.items():
+                key = (scope, period)
+                view = self._views.setdefault(key, self._new())
+                pending = self._pending.setdefault(key, self._new())
+                for item in items:
+                    view.offer(item.product_id, item.quantity, item.product.name)
+                    pending.offer(item.product_id, item.quantity, item.product.name)
+            due = time.monotonic() - self._last_flush >= settings.TOPK_FLUSH_INTERVAL
+        if due:
+            self.flush()
+
+    def top(self, scope, n=5):
+        """Best sellers of the current ``scope`` ("day" or "hour")."""
+        key = (scope, current_periods()[scope])
+        with self._lock:
+            view = self._views.get(key)
+            loaded_at = self._loaded_at.get(key)
+        if loaded_at is None or (
+            time.monotonic() - loaded_at >= settings.TOPK_FLUSH_INTERVAL
+        ):
+            view = self._reload(key)
+        return view.top(n) if view else []
+
+    def flush(self):
+        """Merge unflushed counts into ``TopSellerSnapshot``."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        for (scope, period), sketch in pending.items():
+            try:
+                with transaction.atomic():
+                    snapshot, _ = (
+                        TopSellerSnapshot.objects.select_for_update().get_or_create(
+                            scope=scope, period=period
+                        )
+                    )
+                    merged = SpaceSaving.from_dict(
+                        snapshot.data, settings.TOPK_CAPACITY
+                    ).merge(sketch)
+                    snapshot.data = merged.to_dict()
+                    snapshot.save(update_fields=["data", "updated_at"])
+            except DatabaseError:
+                # Keep the counts for the next flush rather than failing
+                # the checkout that triggered this one.
+                with self._lock:
+                    later = self._pending.get((scope, period))
+                    self._pending[(scope, period)] = (
+                        sketch.merge(later) if later else sketch
+                    )
+                continue
+            self._install((scope, period), merged)
+        self._prune()
+
+    def _reload(self, key):
+        scope, period = key
+        data = (
+            TopSellerSnapshot.objects.filter(scope=scope, period=period)
+            .values_list("data", flat=True)
+            .first()
+        )
+        stored = SpaceSaving.from_dict(data or {}, settings.TOPK_CAPACITY)
+        return self._install(key, stored)
+
+    def _install(self, key, stored):
+        """Make ``stored`` plus any unflushed local counts the view for ``key``."""
+        with self._lock:
+            pending = self._pending.get(key)
+            view = stored.merge(pending) if pending else stored
+            self._views[key] = view
+            self._loaded_at[key] = time.monotonic()
+        return view
+
+    def _prune(self):
+        current = {(scope, period) for scope, period in current_periods().items()}
+        with self._lock:
+            for key in list(self._views):
+                if key not in current and key not in self._pending:
+                    del self._views[key]
+                    self._loaded_at.pop(key, None)
+
+
+best_sellers = BestSellers()
@@ -49,12 +49,31 @@ urlpatterns = [
     path("orders/create/", views.order_create, name="order_create"),
     path("orders/<int:pk>/", views.order_detail, name="order_detail"),
     path("orders/<int:pk>/receipt/", views.order_receipt, name="order_receipt"),
+    path(
+        "orders/<int:pk>/receipt.escpos",
+        views.order_receipt_escpos,
+        name="order_receipt_escpos",
+    ),
     path("reports/", views.reports, name="reports"),
     path("reports/export/pdf/", views.report_export_pdf, name="report_export_pdf"),
     path(
         "reports/export/excel/", views.report_export_excel, name="report_export_excel"
     ),
+    path("reports/export/csv/", views.report_export_csv, name="report_export_csv"),
+    path(
+        "reports/export/ndjson/",
+        views.report_export_ndjson,
+        name="report_export_ndjson",
+    ),
+    path("exports/", views.export_job_list, name="export_job_list"),
+    path("exports/new/", views.export_job_create, name="export_job_create"),
+    path(
+        "exports/<int:pk>/download/",
+        views.export_job_download,
+        name="export_job_download",
+    ),
     path("analytics/", views.analytics, name="analytics"),
+    path("best-sellers/", views.best_sellers, name="best_sellers"),
     path("backups/", views.backups_list, name="backups_list"),
     path(
         "backups/download/<str:filename>/",
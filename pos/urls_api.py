@@ -3,5 +3,19 @@ from . import views
 
 urlpatterns = [
     path("products/", views.api_products, name="api_products"),
+    path("products/changes/", views.api_product_changes, name="api_product_changes"),
+    path(
+        "products/suggest/", views.api_product_suggest, name="api_product_suggest"
+    ),
+    path(
+        "products/by-barcode/<str:code>/",
+        views.api_product_by_barcode,
+        name="api_product_by_barcode",
+    ),
+    path("orders/", views.api_orders, name="api_orders"),
+    path("orders/<int:pk>/", views.api_order_detail, name="api_order_detail"),
     path("orders/create/", views.api_create_order, name="api_create_order"),
+    path(
+        "orders/batch/", views.api_create_orders_batch, name="api_create_orders_batch"
+    ),
 ]
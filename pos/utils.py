@@ -7,15 +7,41 @@ from reportlab.platypus import Paragraph, Table, TableStyle
 from reportlab.lib import colors
 from django.utils import timezone
 from decimal import Decimal
-
-
-def generate_receipt_pdf(order):
-    """Generate thermal receipt PDF (58mm width)"""
+from .pdfstream import StreamingCanvas
+from .receipt_layout import build_receipt_layout
+
+
+# How each receipt layout kind is drawn: (font, size, line height in mm)
+RECEIPT_PDF_STYLES = {
+    "title": ("Helvetica-Bold", 10, 4),
+    "center": ("Helvetica", 7, 3),
+    "text": ("Helvetica", 7, 3),
+    "header": ("Helvetica-Bold", 7, 3),
+    "item": ("Helvetica", 6, 3),
+    "detail": ("Helvetica", 6, 3),
+    "amount": ("Helvetica", 6, 4),
+    "total": ("Helvetica-Bold", 8, 5),
+    "footer": ("Helvetica", 6, 3),
+    "rule": (None, None, 4),
+}
+
+
+def generate_receipt_pdf(order, lines=None):
+    """Generate thermal receipt PDF (58mm width)
+
+    ``lines`` is the shared receipt layout; built from ``order`` if omitted.
+    """
+    if lines is None:
+        lines = build_receipt_layout(order)
     buffer = BytesIO()
 
-    # 58mm width = 58mm, height flexible
+    # 58mm width, height fitted to the content plus 10mm top/bottom margin
     width = 58 * mm
-    height = 200 * mm  # Will adjust based on content
+    content_height = sum(
+        left if kind == "space" else RECEIPT_PDF_STYLES[kind][2]
+        for kind, left, _ in lines
+    )
+    height = (content_height + 20) * mm
 
     # Create PDF
     p = canvas.Canvas(buffer, pagesize=(width, height))
@@ -23,90 +49,24 @@ def generate_receipt_pdf(order):
     # Starting Y position (from top)
     y = height - 10 * mm
 
-    # Store name and header
-    p.setFont("Helvetica-Bold", 10)
-    p.drawCentredString(width / 2, y, "MINI POS")
-    y -= 4 * mm
-
-    p.setFont("Helvetica", 7)
-    p.drawCentredString(width / 2, y, "Jl. Contoh No. 123")
-    y -= 3 * mm
-    p.drawCentredString(width / 2, y, "Telp: 08123456789")
-    y -= 5 * mm
-
-    # Separator line
-    p.line(5 * mm, y, width - 5 * mm, y)
-    y -= 4 * mm
-
-    # Order info
-    p.setFont("Helvetica", 7)
-    p.drawString(5 * mm, y, f"No: #{order.id}")
-    y -= 3 * mm
-    p.drawString(5 * mm, y, f"Tanggal: {order.created_at.strftime('%d/%m/%Y %H:%M')}")
-    y -= 3 * mm
-    p.drawString(5 * mm, y, f"Pelanggan: {order.customer.name}")
-    y -= 4 * mm
-
-    # Separator
-    p.line(5 * mm, y, width - 5 * mm, y)
-    y -= 4 * mm
-
-    # Items header
-    p.setFont("Helvetica-Bold", 7)
-    p.drawString(5 * mm, y, "Item")
-    p.drawRightString(width - 5 * mm, y, "Subtotal")
-    y -= 3 * mm
-
-    p.setFont("Helvetica", 6)
-
-    # Items
-    for item in order.items.all():
-        # Product name (might wrap if too long)
-        product_name = item.product.name
-        if len(product_name) > 25:
-            product_name = product_name[:22] + "..."
-
-        p.drawString(5 * mm, y, product_name)
-        y -= 3 * mm
-
-        # Quantity, price, discount
-        qty_price = f"{item.quantity} x Rp {item.price:,.0f}"
-        p.drawString(7 * mm, y, qty_price)
-        y -= 3 * mm
-
-        if item.discount_percent > 0:
-            discount_text = (
-                f"Diskon {item.discount_percent}% (-Rp {item.discount_amount():,.0f})"
-            )
-            p.drawString(7 * mm, y, discount_text)
-            y -= 3 * mm
-
-        # Subtotal
-        subtotal_text = f"Rp {item.subtotal():,.0f}"
-        p.drawRightString(width - 5 * mm, y, subtotal_text)
-        y -= 4 * mm
-
-    # Separator
-    p.line(5 * mm, y, width - 5 * mm, y)
-    y -= 4 * mm
-
-    # Total
-    p.setFont("Helvetica-Bold", 8)
-    p.drawString(5 * mm, y, "TOTAL")
-    p.drawRightString(width - 5 * mm, y, f"Rp {order.total_price:,.0f}")
-    y -= 5 * mm
-
-    # Separator
-    p.line(5 * mm, y, width - 5 * mm, y)
-    y -= 5 * mm
-
-    # Footer
-    p.setFont("Helvetica", 6)
-    p.drawCentredString(width / 2, y, "Terima kasih atas kunjungan Anda")
-    y -= 3 * mm
-    p.drawCentredString(width / 2, y, "Barang yang sudah dibeli")
-    y -= 3 * mm
-    p.drawCentredString(width / 2, y, "tidak dapat ditukar/dikembalikan")
+    for kind, left, right in lines:
+        if kind == "space":
+            y -= left * mm
+            continue
+        font, size, line_height = RECEIPT_PDF_STYLES[kind]
+        if kind == "rule":
+            p.line(5 * mm, y, width - 5 * mm, y)
+        else:
+            p.setFont(font, size)
+            if kind in ("title", "center", "footer"):
+                p.drawCentredString(width / 2, y, left)
+            elif kind == "detail":
+                p.drawString(7 * mm, y, left)
+            elif left:
+                p.drawString(5 * mm, y, left)
+            if right:
+                p.drawRightString(width - 5 * mm, y, right)
+        y -= line_height * mm
 
     # Finalize PDF
     p.showPage()
@@ -116,12 +76,43 @@ def generate_receipt_pdf(order):
     return buffer
 
 
+def render_receipt_pdf_bytes(lines):
+    """Render a receipt layout to PDF bytes.
+
+    Needs no database access, so it can run in a worker process.
+    """
+    return generate_receipt_pdf(None, lines).getvalue()
+
+
 def generate_report_pdf(start_date, end_date, orders, summary):
     """Generate report PDF in A4 format"""
     buffer = BytesIO()
 
     # Create PDF with A4 page
     p = canvas.Canvas(buffer, pagesize=A4)
+    for _ in _draw_report_pdf(p, start_date, end_date, orders, summary):
+        pass
+
+    buffer.seek(0)
+    return buffer
+
+
+def stream_report_pdf(start_date, end_date, orders, summary):
+    """Generate report PDF in A4 format, yielding bytes page by page.
+
+    Pass ``orders`` as an iterator (e.g. ``qs.iterator()``) so neither the
+    rows nor the finished pages are held in memory all at once.
+    """
+    p = StreamingCanvas(A4)
+    for _ in _draw_report_pdf(p, start_date, end_date, orders, summary):
+        chunk = p.drain()
+        if chunk:
+            yield chunk
+    yield p.drain()
+
+
+def _draw_report_pdf(p, start_date, end_date, orders, summary):
+    """Draw the sales report onto canvas ``p``, yielding after every row."""
     width, height = A4
 
     # Starting position
@@ -180,7 +171,9 @@ def generate_report_pdf(start_date, end_date, orders, summary):
             p.setFont("Helvetica", 9)
 
         p.drawString(50, y, str(idx))
-        p.drawString(100, y, order.created_at.strftime("%d/%m/%Y %H:%M"))
+        p.drawString(
+            100, y, timezone.localtime(order.created_at).strftime("%d/%m/%Y %H:%M")
+        )
 
         # Truncate customer name if too long
         customer_name = order.customer.name
@@ -190,6 +183,7 @@ def generate_report_pdf(start_date, end_date, orders, summary):
 
         p.drawRightString(width - 50, y, f"Rp {order.total_price:,.0f}")
         y -= 15
+        yield
 
     # Footer
     y -= 20
@@ -202,88 +196,112 @@ def generate_report_pdf(start_date, end_date, orders, summary):
     # Finalize
     p.showPage()
     p.save()
-
-    buffer.seek(0)
-    return buffer
+    yield
 
 
 def generate_report_excel(start_date, end_date, orders, summary):
-    """Generate report Excel file"""
+    """Generate report Excel file.
+
+    Uses openpyxl's write-only mode, which flushes each row to a temporary
+    file as it is appended, so ``orders`` can be a queryset iterator of any
+    length. Returns a temporary file positioned at the start; it is deleted
+    when closed. Money and date columns are real numeric/date cells.
+    """
+    import tempfile
     from openpyxl import Workbook
-    from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, Alignment, PatternFill
+
+    money_format = '"Rp" #,##0'
+    date_format = "DD/MM/YYYY HH:MM"
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Laporan Penjualan")
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Laporan Penjualan"
+    # Column widths (must be set before any row is written)
+    ws.column_dimensions["A"].width = 8
+    ws.column_dimensions["B"].width = 20
+    ws.column_dimensions["C"].width = 30
+    ws.column_dimensions["D"].width = 20
+
+    def cell(value, **style):
+        c = WriteOnlyCell(ws, value=value)
+        for attr, val in style.items():
+            setattr(c, attr, val)
+        return c
+
+    centered = Alignment(horizontal="center")
 
     # Title
-    ws["A1"] = "LAPORAN PENJUALAN"
-    ws["A1"].font = Font(size=16, bold=True)
-    ws["A1"].alignment = Alignment(horizontal="center")
-    ws.merge_cells("A1:D1")
+    title_font = Font(size=16, bold=True)
+    ws.append([cell("LAPORAN PENJUALAN", font=title_font, alignment=centered)])
+    ws.merged_cells.add("A1:D1")
 
     # Period
-    ws["A2"] = (
+    period_text = (
         f"Periode: {start_date.strftime('%d/%m/%Y')} - {end_date.strftime('%d/%m/%Y')}"
     )
-    ws["A2"].alignment = Alignment(horizontal="center")
-    ws.merge_cells("A2:D2")
+    ws.append([cell(period_text, alignment=centered)])
+    ws.merged_cells.add("A2:D2")
+    ws.append([])
 
     # Summary
-    ws["A4"] = "Ringkasan"
-    ws["A4"].font = Font(bold=True, size=12)
-
-    ws["A5"] = "Total Transaksi:"
-    ws["B5"] = summary["total_orders"]
-
-    ws["A6"] = "Total Penjualan:"
-    ws["B6"] = f"Rp {summary['total_sales']:,.0f}"
-
-    ws["A7"] = "Rata-rata per Transaksi:"
-    ws["B7"] = f"Rp {summary['avg_sales']:,.0f}"
+    ws.append([cell("Ringkasan", font=Font(bold=True, size=12))])
+    ws.append(["Total Transaksi:", summary["total_orders"]])
+    ws.append(
+        ["Total Penjualan:", cell(summary["total_sales"], number_format=money_format)]
+    )
+    ws.append(
+        [
+            "Rata-rata per Transaksi:",
+            cell(summary["avg_sales"], number_format=money_format),
+        ]
+    )
+    ws.append([])
 
     # Table header
-    row = 9
-    headers = ["No", "Tanggal", "Pelanggan", "Total"]
     header_fill = PatternFill(
         start_color="366092", end_color="366092", fill_type="solid"
     )
     header_font = Font(color="FFFFFF", bold=True)
+    ws.append(
+        [
+            cell(header, fill=header_fill, font=header_font, alignment=centered)
+            for header in ["No", "Tanggal", "Pelanggan", "Total"]
+        ]
+    )
 
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=row, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal="center")
-
-    # Table data
-    row += 1
+    # Table data (header is row 9, data starts at row 10)
+    idx = 0
     for idx, order in enumerate(orders, 1):
-        ws.cell(row=row, column=1, value=idx)
-        ws.cell(row=row, column=2, value=order.created_at.strftime("%d/%m/%Y %H:%M"))
-        ws.cell(row=row, column=3, value=order.customer.name)
-        ws.cell(row=row, column=4, value=f"Rp {order.total_price:,.0f}")
-        row += 1
+        ws.append(
+            [
+                idx,
+                # Excel has no time zones; write the naive local time.
+                cell(
+                    timezone.localtime(order.created_at).replace(tzinfo=None),
+                    number_format=date_format,
+                ),
+                order.customer.name,
+                cell(order.total_price, number_format=money_format),
+            ]
+        )
 
     # Total row
-    row += 1
-    total_cell = ws.cell(row=row, column=1, value="TOTAL")
-    total_cell.font = Font(bold=True)
-    ws.merge_cells(f"A{row}:C{row}")
-
-    total_value_cell = ws.cell(
-        row=row, column=4, value=f"Rp {summary['total_sales']:,.0f}"
+    ws.append([])
+    row = 9 + idx + 2
+    bold = Font(bold=True)
+    ws.append(
+        [
+            cell("TOTAL", font=bold),
+            None,
+            None,
+            cell(summary["total_sales"], font=bold, number_format=money_format),
+        ]
     )
-    total_value_cell.font = Font(bold=True)
+    ws.merged_cells.add(f"A{row}:C{row}")
 
-    # Column widths
-    ws.column_dimensions["A"].width = 8
-    ws.column_dimensions["B"].width = 20
-    ws.column_dimensions["C"].width = 30
-    ws.column_dimensions["D"].width = 20
-
-    # Save to buffer
-    buffer = BytesIO()
+    buffer = tempfile.TemporaryFile()
     wb.save(buffer)
     buffer.seek(0)
 
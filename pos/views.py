@@ -1,21 +1,34 @@
 from decimal import Decimal
 import json
-from datetime import timedelta, datetime
+from datetime import date, timedelta, datetime
 from django.utils import timezone
-from django.db.models import Sum, Count, F
+from django.db.models import Sum, Count, F, Q
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse, HttpResponseBadRequest, HttpResponse
+from django.http import (
+    JsonResponse,
+    HttpResponseBadRequest,
+    HttpResponse,
+    Http404,
+    StreamingHttpResponse,
+    FileResponse,
+    HttpResponseNotModified,
+)
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from .models import (
     Product,
     Customer,
     Order,
-    OrderItem,
     Category,
     Supplier,
     PurchaseOrder,
     PurchaseOrderItem,
+    DailySales,
+    ExportJob,
+    HourlySales,
+    DailyCategorySales,
+    DailyProductSales,
+    ApiKey,
 )
 from .forms import (
     ProductForm,
@@ -24,13 +37,32 @@ from .forms import (
     SupplierForm,
 )
 from django.views.decorators.http import require_http_methods
-from django.db import transaction
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from django.db import transaction, IntegrityError
 from django.conf import settings
-from django.http import HttpResponseForbidden
 from functools import wraps
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from urllib.parse import urlencode
+from django.utils.http import parse_etags
 from django.contrib import messages
-from .utils import generate_receipt_pdf, generate_report_pdf, generate_report_excel
+from .apiresponse import FastJsonResponse, catalog_conditional, compressed
+from . import apikeys, barcodes, changefeed, columnar, idempotency, jobs, receipts, search, suggest, topk
+from .utils import stream_report_pdf, generate_report_excel
+from .exports import export_rows, stream_csv, stream_ndjson
+from .reporting import SalesReport
+from .pagination import akeyset_paginate, keyset_paginate, InvalidCursor
+from .receipt_layout import (
+    build_receipt_layout,
+    render_receipt_escpos,
+    render_receipt_text,
+)
+from .checkout import (
+    place_order,
+    place_order_batch,
+    CheckoutError,
+    InsufficientStock,
+    UnknownProduct,
+)
 
 
 def login_view(request):
@@ -64,46 +96,66 @@ def clear_cache_page(request):
     return render(request, "clear_cache.html")
 
 
-@login_required
-def dashboard(request):
+async def _is_authenticated(request):
+    # request.user is resolved lazily from the session, which is sync-only.
+    return await sync_to_async(lambda: request.user.is_authenticated)()
+
+
+def async_login_required(view_func):
+    """``login_required`` for async views (Django 4.2's only wraps sync ones)."""
+
+    @wraps(view_func)
+    async def _wrapped(request, *args, **kwargs):
+        if not await _is_authenticated(request):
+            return redirect_to_login(request.get_full_path())
+        return await view_func(request, *args, **kwargs)
+
+    return _wrapped
+
+
+@async_login_required
+async def dashboard(request):
     """Show a small dashboard with counts."""
-    products_count = Product.objects.count()
-    customers_count = Customer.objects.count()
-    orders_count = Order.objects.count()
-    # total revenue (sum of all orders)
-    total_rev = Order.objects.aggregate(total=Sum("total_price"))["total"] or Decimal(
-        "0"
+    product_stats = await Product.objects.aaggregate(
+        total=Count("id"), low_stock=Count("id", filter=Q(stock__lt=5))
     )
+    products_count = product_stats["total"]
+    customers_count = await Customer.objects.acount()
+    order_stats = await Order.objects.aaggregate(
+        count=Count("id"), total=Sum("total_price")
+    )
+    orders_count = order_stats["count"]
+    # total revenue (sum of all orders)
+    total_rev = order_stats["total"] or Decimal("0")
 
-    # Low stock warning (products with stock < 5)
-    low_stock_products = Product.objects.filter(stock__lt=5).order_by("stock")
-    low_stock_count = low_stock_products.count()
+    # Low stock warning (products with stock < 5), top 5
+    low_stock_products = [
+        p async for p in Product.objects.filter(stock__lt=5).order_by("stock")[:5]
+    ]
+    low_stock_count = product_stats["low_stock"]
 
-    # last 7 days sales (by order.created_at date)
+    # last 7 days sales, read from the DailySales rollup in one query
     today = timezone.localdate()
+    days = [today - timedelta(days=i) for i in range(6, -1, -1)]
+    rollups = {
+        row.date: row async for row in DailySales.objects.filter(date__gte=days[0])
+    }
     labels = []
     data = []
     labels_display = []
     counts = []
-    for i in range(6, -1, -1):
-        day = today - timedelta(days=i)
+    for day in days:
         labels.append(day.strftime("%Y-%m-%d"))
         # human-friendly label, e.g. '22 Nov'
         labels_display.append(day.strftime("%d %b"))
-        day_total = Order.objects.filter(created_at__date=day).aggregate(
-            total=Sum("total_price")
-        )["total"] or Decimal("0")
-        day_count = (
-            Order.objects.filter(created_at__date=day).aggregate(count=Count("id"))[
-                "count"
-            ]
-            or 0
-        )
+        row = rollups.get(day)
         # convert Decimal to float for JSON/Chart.js
-        data.append(float(day_total))
-        counts.append(day_count)
+        data.append(float(row.revenue) if row else 0.0)
+        counts.append(row.order_count if row else 0)
 
-    return render(
+    top = sync_to_async(topk.best_sellers.top)
+    # Templates read the session (messages, user), so render off the loop.
+    return await sync_to_async(render)(
         request,
         "pos/dashboard.html",
         {
@@ -111,12 +163,16 @@ def dashboard(request):
             "customers_count": customers_count,
             "orders_count": orders_count,
             "total_revenue": total_rev,
-            "low_stock_products": low_stock_products[:5],  # Show top 5
+            "low_stock_products": low_stock_products,
             "low_stock_count": low_stock_count,
             "sales_labels_json": json.dumps(labels),
             "sales_labels_display_json": json.dumps(labels_display),
             "sales_counts_json": json.dumps(counts),
             "sales_data_json": json.dumps(data),
+            "best_sellers": [
+                ("hour", "Terlaris Jam Ini", await top("hour")),
+                ("day", "Terlaris Hari Ini", await top("day")),
+            ],
         },
     )
 
@@ -191,8 +247,9 @@ def product_list(request):
     products = Product.objects.all()
     query = request.GET.get("q", "").strip()
     if query:
-        products = products.filter(name__icontains=query)
-    products = products.order_by("-created_at")
+        products = search.filter_queryset(products, "product", query)
+    else:
+        products = products.order_by("-created_at")
     return render(
         request, "pos/product_list.html", {"products": products, "query": query}
     )
@@ -241,10 +298,9 @@ def customer_list(request):
     customers = Customer.objects.all()
     query = request.GET.get("q", "").strip()
     if query:
-        customers = customers.filter(name__icontains=query) | customers.filter(
-            phone__icontains=query
-        )
-    customers = customers.order_by("-created_at")
+        customers = search.filter_queryset(customers, "customer", query)
+    else:
+        customers = customers.order_by("-created_at")
     return render(
         request, "pos/customer_list.html", {"customers": customers, "query": query}
     )
@@ -295,7 +351,7 @@ def supplier_list(request):
     suppliers = Supplier.objects.all()
     query = request.GET.get("q", "").strip()
     if query:
-        suppliers = suppliers.filter(name__icontains=query)
+        suppliers = search.filter_queryset(suppliers, "supplier", query)
     return render(
         request, "pos/supplier_list.html", {"suppliers": suppliers, "query": query}
     )
@@ -459,13 +515,26 @@ def purchase_order_receive(request, pk):
 
 @login_required
 def orders_list(request):
-    """List orders."""
-    orders = Order.objects.all()
+    """List orders, newest first, with keyset pagination."""
+    orders = Order.objects.select_related("customer")
     query = request.GET.get("q", "").strip()
     if query:
-        orders = orders.filter(customer__name__icontains=query)
-    orders = orders.order_by("-created_at")
-    return render(request, "pos/orders_list.html", {"orders": orders, "query": query})
+        orders = search.filter_queryset(orders, "customer", query, field="customer_id")
+    try:
+        page = keyset_paginate(orders, request.GET.get("cursor"), per_page=25)
+    except InvalidCursor:
+        return HttpResponseBadRequest("Invalid cursor")
+    total_count = orders.count() if settings.PAGINATION_EXACT_COUNT else None
+    return render(
+        request,
+        "pos/orders_list.html",
+        {
+            "orders": page,
+            "page_obj": page,
+            "total_count": total_count,
+            "query": query,
+        },
+    )
 
 
 @login_required
@@ -477,12 +546,47 @@ def order_detail(request, pk):
 
 @login_required
 def order_receipt(request, pk):
-    """Generate and download receipt PDF."""
-    order = get_object_or_404(Order, pk=pk)
-    pdf_buffer = generate_receipt_pdf(order)
+    """Serve the receipt PDF, rendering it only if it is not cached yet."""
+    try:
+        order = receipts.load_order(pk)
+    except Order.DoesNotExist:
+        raise Http404("No Order matches the given query.")
+
+    lines = build_receipt_layout(order)
+    etag = f'"{receipts.receipt_etag(lines)}"'
+    if etag in parse_etags(request.headers.get("If-None-Match", "")):
+        response = HttpResponseNotModified()
+    else:
+        path = receipts.cached_receipt(order, lines, etag.strip('"'))
+        response = FileResponse(open(path, "rb"), content_type="application/pdf")
+        response["Content-Disposition"] = f'inline; filename="receipt_{order.id}.pdf"'
+    response["ETag"] = etag
+    # Receipts change only if the order itself is edited; let the browser
+    # revalidate with the ETag instead of refetching.
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
 
-    response = HttpResponse(pdf_buffer, content_type="application/pdf")
-    response["Content-Disposition"] = f'inline; filename="receipt_{order.id}.pdf"'
+@login_required
+def order_receipt_escpos(request, pk):
+    """Receipt as raw ESC/POS bytes for thermal printers.
+
+    ``?format=text`` returns the same receipt as plain monospaced text.
+    """
+    try:
+        order = receipts.load_order(pk)
+    except Order.DoesNotExist:
+        raise Http404("No Order matches the given query.")
+
+    lines = build_receipt_layout(order)
+    if request.GET.get("format") == "text":
+        return HttpResponse(
+            render_receipt_text(lines), content_type="text/plain; charset=utf-8"
+        )
+    response = HttpResponse(
+        render_receipt_escpos(lines), content_type="application/octet-stream"
+    )
+    response["Content-Disposition"] = f'inline; filename="receipt_{order.id}.bin"'
     return response
 
 
@@ -493,7 +597,6 @@ def order_create(request):
     POST fields: 'customer', multiple 'product', 'quantity', and 'discount'
     """
     customers = Customer.objects.all()
-    products = Product.objects.all()
 
     if request.method == "POST":
         customer_id = request.POST.get("customer")
@@ -506,62 +609,34 @@ def order_create(request):
 
         customer = get_object_or_404(Customer, pk=customer_id)
 
-        items = []
-        insufficient = []
+        lines = []
         for pid, q, disc in zip(product_ids, qtys, discounts):
             try:
-                prod = Product.objects.get(pk=int(pid))
+                pid = int(pid)
                 qty = int(q)
                 discount = Decimal(disc) if disc else Decimal("0")
             except Exception:
                 continue
             if qty <= 0:
                 continue
-            # Check stock availability; collect insufficient instead of 400
-            if prod.stock < qty:
-                insufficient.append((prod, qty))
-                continue
-            items.append((prod, qty, discount))
+            lines.append((pid, qty, discount))
 
-        if insufficient:
+        if not lines:
+            return HttpResponseBadRequest("No valid items")
+
+        try:
+            order, out_of_stock = place_order(customer, lines)
+        except InsufficientStock as exc:
             # Show error messages for each insufficient product
-            for prod, qty in insufficient:
+            for prod, qty, available in exc.shortages:
                 messages.error(
                     request,
-                    f"Stok tidak cukup untuk produk '{prod.name}'. Diminta {qty}, tersedia {prod.stock}.",
+                    f"Stok tidak cukup untuk produk '{prod.name}'. Diminta {qty}, tersedia {available}.",
                 )
-            return render(
-                request,
-                "pos/order_create.html",
-                {"customers": customers, "products": products},
-            )
-
-        if not items:
+            return render(request, "pos/order_create.html", {"customers": customers})
+        except CheckoutError:
             return HttpResponseBadRequest("No valid items")
 
-        with transaction.atomic():
-            total = Decimal("0")
-            for prod, qty, discount in items:
-                subtotal = prod.price * qty
-                discount_amount = subtotal * (discount / 100)
-                total += subtotal - discount_amount
-
-            order = Order.objects.create(customer=customer, total_price=total)
-            out_of_stock = []
-            for prod, qty, discount in items:
-                OrderItem.objects.create(
-                    order=order,
-                    product=prod,
-                    quantity=qty,
-                    price=prod.price,
-                    discount_percent=discount,
-                )
-                # Decrease product stock and save
-                prod.stock = prod.stock - qty
-                prod.save(update_fields=["stock"])
-                if prod.stock == 0:
-                    out_of_stock.append(prod.name)
-
         if out_of_stock:
             # Show one warning listing all products that are now empty
             messages.warning(
@@ -573,62 +648,50 @@ def order_create(request):
 
         return redirect("order_detail", pk=order.id)
 
-    return render(
-        request, "pos/order_create.html", {"customers": customers, "products": products}
-    )
+    return render(request, "pos/order_create.html", {"customers": customers})
+
+
+def _sales_report(request):
+    """Build the SalesReport for the request's period/start/end parameters."""
+    try:
+        return SalesReport.from_params(request.GET)
+    except ValueError:
+        return None
 
 
 @login_required
 def reports(request):
-    """Simple transactions report with period filter."""
-    # Get period filter (default: all)
-    period = request.GET.get("period", "all")
+    """Transactions report for a preset period or a custom date range."""
+    report = _sales_report(request)
+    if report is None:
+        return HttpResponseBadRequest("Invalid date range")
 
-    orders_qs = Order.objects.all()
+    summary = report.summary()
 
-    # Apply date filter based on period
-    today = timezone.localdate()
-    start_date = None
-    end_date = today
-
-    if period == "daily":
-        start_date = today
-        orders_qs = orders_qs.filter(created_at__date=today)
-    elif period == "weekly":
-        start_date = today - timedelta(days=7)
-        orders_qs = orders_qs.filter(created_at__date__gte=start_date)
-    elif period == "monthly":
-        start_date = today - timedelta(days=30)
-        orders_qs = orders_qs.filter(created_at__date__gte=start_date)
-
-    orders_qs = orders_qs.order_by("-created_at")
-
-    # total sales across filtered orders (Decimal)
-    total_sales = orders_qs.aggregate(total=Sum("total_price"))["total"] or Decimal("0")
-
-    # server-side pagination for reports (page size 15)
-    page_size = 15
-    paginator = Paginator(orders_qs, page_size)
-    page = request.GET.get("page")
+    # keyset pagination for reports (page size 15)
     try:
-        orders_page = paginator.page(page)
-    except PageNotAnInteger:
-        orders_page = paginator.page(1)
-    except EmptyPage:
-        orders_page = paginator.page(paginator.num_pages)
+        orders_page = keyset_paginate(
+            report.orders.select_related("customer"),
+            request.GET.get("cursor"),
+            per_page=15,
+        )
+    except InvalidCursor:
+        return HttpResponseBadRequest("Invalid cursor")
 
     return render(
         request,
         "pos/reports.html",
         {
             "orders": orders_page,
-            "total_sales": total_sales,
-            "paginator": paginator,
+            "total_sales": summary["total_sales"],
+            "summary": summary,
             "page_obj": orders_page,
             "is_paginated": orders_page.has_other_pages(),
-            "period": period,
-            "start_date": start_date,
-            "end_date": end_date,
+            "period": report.period,
+            "start_date": report.start_date,
+            "end_date": report.end_date,
+            "report_query": urlencode(report.query_params()),
+            "report_params": report.query_params(),
         },
     )
 
@@ -636,186 +699,268 @@ def reports(request):
 @login_required
 def report_export_pdf(request):
     """Export report to PDF"""
-    period = request.GET.get("period", "all")
+    report = _sales_report(request)
+    if report is None:
+        return HttpResponseBadRequest("Invalid date range")
+
+    # Stream the PDF page by page
+    response = StreamingHttpResponse(
+        stream_report_pdf(
+            report.period_start,
+            report.end_date,
+            report.iter_orders(),
+            report.summary(),
+        ),
+        content_type="application/pdf",
+    )
+    filename = report.filename("pdf")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
 
-    orders_qs = Order.objects.all()
+    return response
 
-    # Apply date filter
-    today = timezone.localdate()
-    start_date = None
-    end_date = today
-
-    if period == "daily":
-        start_date = today
-        orders_qs = orders_qs.filter(created_at__date=today)
-    elif period == "weekly":
-        start_date = today - timedelta(days=7)
-        orders_qs = orders_qs.filter(created_at__date__gte=start_date)
-    elif period == "monthly":
-        start_date = today - timedelta(days=30)
-        orders_qs = orders_qs.filter(created_at__date__gte=start_date)
-    else:
-        # For 'all', use earliest order date as start
-        first_order = orders_qs.order_by("created_at").first()
-        start_date = first_order.created_at.date() if first_order else today
 
-    orders_qs = orders_qs.order_by("-created_at")
+@login_required
+def report_export_excel(request):
+    """Export report to Excel"""
+    report = _sales_report(request)
+    if report is None:
+        return HttpResponseBadRequest("Invalid date range")
 
-    # Calculate summary
-    total_sales = orders_qs.aggregate(total=Sum("total_price"))["total"] or Decimal("0")
-    total_orders = orders_qs.count()
-    avg_sales = total_sales / total_orders if total_orders > 0 else Decimal("0")
+    excel_file = generate_report_excel(
+        report.period_start, report.end_date, report.iter_orders(), report.summary()
+    )
 
-    summary = {
-        "total_sales": total_sales,
-        "total_orders": total_orders,
-        "avg_sales": avg_sales,
-    }
+    # Return as download
+    return FileResponse(
+        excel_file,
+        as_attachment=True,
+        filename=report.filename("xlsx"),
+        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    )
 
-    # Generate PDF
-    pdf_buffer = generate_report_pdf(start_date, end_date, orders_qs, summary)
 
-    # Return as download
-    response = HttpResponse(pdf_buffer, content_type="application/pdf")
-    filename = f'laporan_{period}_{today.strftime("%Y%m%d")}.pdf'
+@login_required
+def report_export_csv(request):
+    """Export report rows as streamed CSV."""
+    report = _sales_report(request)
+    if report is None:
+        return HttpResponseBadRequest("Invalid date range")
+    response = StreamingHttpResponse(
+        stream_csv(export_rows(report.orders)), content_type="text/csv; charset=utf-8"
+    )
+    filename = report.filename("csv")
     response["Content-Disposition"] = f'attachment; filename="{filename}"'
-
     return response
 
 
 @login_required
-def report_export_excel(request):
-    """Export report to Excel"""
-    period = request.GET.get("period", "all")
+def report_export_ndjson(request):
+    """Export report rows as streamed newline-delimited JSON."""
+    report = _sales_report(request)
+    if report is None:
+        return HttpResponseBadRequest("Invalid date range")
+    response = StreamingHttpResponse(
+        stream_ndjson(export_rows(report.orders)), content_type="application/x-ndjson"
+    )
+    filename = report.filename("ndjson")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
 
-    orders_qs = Order.objects.all()
 
-    # Apply date filter
-    today = timezone.localdate()
-    start_date = None
-    end_date = today
-
-    if period == "daily":
-        start_date = today
-        orders_qs = orders_qs.filter(created_at__date=today)
-    elif period == "weekly":
-        start_date = today - timedelta(days=7)
-        orders_qs = orders_qs.filter(created_at__date__gte=start_date)
-    elif period == "monthly":
-        start_date = today - timedelta(days=30)
-        orders_qs = orders_qs.filter(created_at__date__gte=start_date)
+@login_required
+@require_http_methods(["POST"])
+def export_job_create(request):
+    """Queue a background PDF/Excel export of the current report window."""
+    fmt = request.POST.get("format")
+    if fmt not in dict(ExportJob.FORMAT_CHOICES):
+        return HttpResponseBadRequest("Invalid format")
+    try:
+        report = SalesReport.from_params(request.POST)
+    except ValueError:
+        return HttpResponseBadRequest("Invalid date range")
+
+    job, created = jobs.request_export(fmt, report, user=request.user)
+    if created:
+        messages.success(request, f"Export #{job.id} sedang diproses.")
     else:
-        # For 'all', use earliest order date as start
-        first_order = orders_qs.order_by("created_at").first()
-        start_date = first_order.created_at.date() if first_order else today
+        messages.info(
+            request, f"Export yang sama sudah diproses (#{job.id}), silakan tunggu."
+        )
+    return redirect("export_job_list")
 
-    orders_qs = orders_qs.order_by("-created_at")
 
-    # Calculate summary
-    total_sales = orders_qs.aggregate(total=Sum("total_price"))["total"] or Decimal("0")
-    total_orders = orders_qs.count()
-    avg_sales = total_sales / total_orders if total_orders > 0 else Decimal("0")
+@login_required
+def export_job_list(request):
+    """List recent background exports."""
+    export_jobs = ExportJob.objects.select_related("requested_by")[:50]
+    return render(request, "pos/export_jobs.html", {"jobs": export_jobs})
 
-    summary = {
-        "total_sales": total_sales,
-        "total_orders": total_orders,
-        "avg_sales": avg_sales,
-    }
 
-    # Generate Excel
-    excel_buffer = generate_report_excel(start_date, end_date, orders_qs, summary)
+@login_required
+def export_job_download(request, pk):
+    """Download a finished background export."""
+    job = get_object_or_404(ExportJob, pk=pk, status="done")
+    path = jobs.export_path(job)
+    if not path.exists():
+        raise Http404("Export file no longer exists")
+    return FileResponse(open(path, "rb"), as_attachment=True, filename=job.file_name)
 
-    # Return as download
-    response = HttpResponse(
-        excel_buffer,
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
-    filename = f'laporan_{period}_{today.strftime("%Y%m%d")}.xlsx'
-    response["Content-Disposition"] = f'attachment; filename="{filename}"'
 
-    return response
+# Preset analytics windows, in days
+ANALYTICS_WINDOWS = (7, 30, 90, 365)
 
 
-@login_required
-def analytics(request):
-    """Advanced analytics with charts - optimized version."""
-    today = timezone.localdate()
-    start_date = today - timedelta(days=7)  # Reduced from 30 to 7 days
+def _analytics_from_rollups(start_date, end_date):
+    """Chart data from the per-day rollup tables."""
+    window = {"date__gte": start_date, "date__lte": end_date}
 
     # Top 5 categories only
-    category_sales = (
-        OrderItem.objects.filter(order__created_at__date__gte=start_date)
-        .values(category_name=F("product__category__name"))
-        .annotate(
-            total=Sum(F("quantity") * F("price") * (1 - F("discount_percent") / 100))
-        )
-        .order_by("-total")[:5]  # Limit to top 5
-    )
-
-    category_labels = []
-    category_data = []
-    for item in category_sales:
-        if item["category_name"]:
-            category_labels.append(item["category_name"])
-            category_data.append(float(item["total"] or 0))
+    categories = [
+        (item["category_name"], float(item["total"] or 0))
+        for item in DailyCategorySales.objects.filter(**window)
+        .values(category_name=F("category__name"))
+        .annotate(total=Sum("revenue"))
+        .order_by("-total")[:5]
+    ]
 
     # Top 5 products only
-    top_products = (
-        OrderItem.objects.filter(order__created_at__date__gte=start_date)
-        .values(product_name=F("product__name"))
-        .annotate(
-            total_qty=Sum("quantity"),
-            total_sales=Sum(
-                F("quantity") * F("price") * (1 - F("discount_percent") / 100)
-            ),
+    products = [
+        (
+            item["product_name"],
+            int(item["total_qty"] or 0),
+            float(item["total_sales"] or 0),
         )
-        .order_by("-total_sales")[:5]  # Reduced from 10 to 5
-    )
-
-    product_labels = []
-    product_qty_data = []
-    product_sales_data = []
-    for item in top_products:
-        product_labels.append(item["product_name"])
-        product_qty_data.append(int(item["total_qty"] or 0))
-        product_sales_data.append(float(item["total_sales"] or 0))
-
-    # Simplified hourly sales - only last 7 days
-    hourly_sales = (
-        Order.objects.filter(created_at__date__gte=start_date)
-        .annotate(hour=F("created_at__hour"))
-        .values("hour")
-        .annotate(total=Sum("total_price"), count=Count("id"))
-        .order_by("hour")
-    )
+        for item in DailyProductSales.objects.filter(**window)
+        .values(product_name=F("product__name"))
+        .annotate(total_qty=Sum("quantity"), total_sales=Sum("revenue"))
+        .order_by("-total_sales")[:5]
+    ]
 
-    hour_labels = [f"{h:02d}:00" for h in range(24)]
+    # Sales per hour of day across the window
     hour_data = [0] * 24
     hour_counts = [0] * 24
+    for item in (
+        HourlySales.objects.filter(**window)
+        .values("hour")
+        .annotate(total=Sum("revenue"), count=Sum("order_count"))
+    ):
+        hour_data[item["hour"]] = float(item["total"] or 0)
+        hour_counts[item["hour"]] = int(item["count"] or 0)
+
+    return {
+        "categories": categories,
+        "products": products,
+        "hour_data": hour_data,
+        "hour_counts": hour_counts,
+    }
 
-    for item in hourly_sales:
-        hour = item["hour"]
-        hour_data[hour] = float(item["total"] or 0)
-        hour_counts[hour] = int(item["count"] or 0)
+
+def _analytics_from_columns(start_date, end_date):
+    """Chart data plus heatmap, basket sizes and discount buckets from NumPy."""
+    store = columnar.get_store()
+    top_categories = store.top_categories(start_date, end_date)
+    top_products = store.top_products(start_date, end_date)
+    category_names = Category.objects.in_bulk([cid for cid, _ in top_categories])
+    product_names = Product.objects.in_bulk([pid for pid, _, _ in top_products])
+    hour_data, hour_counts = store.hourly(start_date, end_date)
+
+    heatmap = store.heatmap(start_date, end_date)
+    peak = max(max(row) for row in heatmap) or 1
+    basket_sizes = store.basket_sizes(start_date, end_date)
+    # Rows deleted since the store was loaded are skipped rather than named.
+    return {
+        "categories": [
+            (category_names[cid].name, total)
+            for cid, total in top_categories
+            if cid in category_names
+        ],
+        "products": [
+            (product_names[pid].name, qty, sales)
+            for pid, qty, sales in top_products
+            if pid in product_names
+        ],
+        "hour_data": hour_data,
+        "hour_counts": hour_counts,
+        "heatmap": [
+            (label, [(value, round(value / peak, 2)) for value in row])
+            for label, row in zip(columnar.WEEKDAY_LABELS, heatmap)
+        ],
+        "basket_sizes": [
+            (f"{size}+" if size == len(basket_sizes) else str(size), count)
+            for size, count in enumerate(basket_sizes, start=1)
+        ],
+        "discount_effect": store.discount_effect(start_date, end_date),
+    }
+
+
+@login_required
+def analytics(request):
+    """Sales analytics for a preset or custom window.
+
+    Charts come from the rollup tables, or from the in-process NumPy store
+    (``pos.columnar``) when ANALYTICS_BACKEND or ``?backend=`` is
+    ``numpy``; the NumPy backend also adds the weekday x hour heatmap,
+    basket sizes and discount buckets.
+    """
+    today = timezone.localdate()
+    try:
+        if request.GET.get("start"):
+            start_date = date.fromisoformat(request.GET["start"])
+            end_date = date.fromisoformat(request.GET.get("end") or today.isoformat())
+            if start_date > end_date:
+                raise ValueError("start must not be after end")
+            days = None
+        else:
+            days = int(request.GET.get("days", 7))
+            if days not in ANALYTICS_WINDOWS:
+                days = 7
+            start_date, end_date = today - timedelta(days=days), today
+    except ValueError:
+        return HttpResponseBadRequest("Invalid date range")
+
+    backend = request.GET.get("backend") or settings.ANALYTICS_BACKEND
+    if backend == "numpy" and columnar.available():
+        data = _analytics_from_columns(start_date, end_date)
+    else:
+        backend = "rollups"
+        data = _analytics_from_rollups(start_date, end_date)
 
     return render(
         request,
         "pos/analytics.html",
         {
-            "category_labels_json": json.dumps(category_labels),
-            "category_data_json": json.dumps(category_data),
-            "product_labels_json": json.dumps(product_labels),
-            "product_qty_data_json": json.dumps(product_qty_data),
-            "product_sales_data_json": json.dumps(product_sales_data),
-            "hour_labels_json": json.dumps(hour_labels),
-            "hour_data_json": json.dumps(hour_data),
-            "hour_counts_json": json.dumps(hour_counts),
+            "category_labels_json": json.dumps([c[0] for c in data["categories"]]),
+            "category_data_json": json.dumps([c[1] for c in data["categories"]]),
+            "product_labels_json": json.dumps([p[0] for p in data["products"]]),
+            "product_qty_data_json": json.dumps([p[1] for p in data["products"]]),
+            "product_sales_data_json": json.dumps([p[2] for p in data["products"]]),
+            "hour_labels_json": json.dumps([f"{h:02d}:00" for h in range(24)]),
+            "hour_data_json": json.dumps(data["hour_data"]),
+            "hour_counts_json": json.dumps(data["hour_counts"]),
+            "heatmap": data.get("heatmap"),
+            "hour_range": range(24),
+            "basket_sizes": data.get("basket_sizes"),
+            "discount_effect": data.get("discount_effect"),
             "start_date": start_date,
-            "end_date": today,
+            "end_date": end_date,
+            "days": days,
+            "windows": ANALYTICS_WINDOWS,
+            "backend": backend,
         },
     )
 
 
+@async_login_required
+async def best_sellers(request):
+    """Live best sellers for the current hour and day, from memory (JSON)."""
+    limit = _api_limit(request, default=5, maximum=20)
+    # Normally served from memory; reloads a stale sketch from the database.
+    top = sync_to_async(topk.best_sellers.top)
+    return JsonResponse(
+        {"hour": await top("hour", limit), "day": await top("day", limit)}
+    )
+
+
 @login_required
 def backups_list(request):
     """List available SQLite backups in backup/ directory."""
@@ -838,7 +983,6 @@ def backups_list(request):
 def backup_download(request, filename):
     """Download chosen backup file."""
     import re
-    from django.http import FileResponse
 
     if not re.match(r"^db_backup_\d{8}\.sqlite3$", filename):
         return HttpResponseBadRequest("Invalid backup filename")
@@ -868,10 +1012,11 @@ def product_import(request):
             wb = load_workbook(excel_file)
             ws = wb.active
 
-            # Expected columns: Name, Category, Price, Stock, Description
-            # Skip header row
+            # Expected columns: Name, Category, Price, Stock, Description,
+            # Barcode. Skip header row
             rows = list(ws.iter_rows(min_row=2, values_only=True))
             created_count = 0
+            updated_count = 0
             skipped = []
 
             for idx, row in enumerate(rows, start=2):
@@ -883,21 +1028,38 @@ def product_import(request):
                     price = Decimal(str(row[2]))
                     stock = int(row[3]) if row[3] else 0
                     description = str(row[4]).strip() if row[4] and len(row) > 4 else ""
+                    barcode = str(row[5]).strip() if len(row) > 5 and row[5] else None
 
                     # Find or skip category
                     category = None
                     if category_name:
                         category, _ = Category.objects.get_or_create(name=category_name)
 
-                    # Create product
-                    Product.objects.create(
-                        name=name,
-                        category=category,
-                        price=price,
-                        stock=stock,
-                        description=description,
+                    fields = {
+                        "name": name,
+                        "category": category,
+                        "price": price,
+                        "stock": stock,
+                        "description": description,
+                    }
+                    # A known barcode updates that product instead of adding
+                    # a duplicate
+                    product = (
+                        Product.objects.filter(barcode=barcode).first()
+                        if barcode
+                        else None
                     )
-                    created_count += 1
+                    if product:
+                        for field, value in fields.items():
+                            setattr(product, field, value)
+                        product.full_clean()
+                        product.save()
+                        updated_count += 1
+                    else:
+                        product = Product(barcode=barcode, **fields)
+                        product.full_clean()
+                        product.save()
+                        created_count += 1
                 except Exception as e:
                     skipped.append(f"Baris {idx}: {str(e)}")
 
@@ -905,6 +1067,10 @@ def product_import(request):
                 messages.success(
                     request, f"Berhasil mengimport {created_count} produk."
                 )
+            if updated_count > 0:
+                messages.success(
+                    request, f"Memperbarui {updated_count} produk (barcode sudah ada)."
+                )
             if skipped:
                 messages.warning(
                     request,
@@ -931,14 +1097,16 @@ def product_import_template(request):
     ws.title = "Products"
 
     # Header row
-    headers = ["Name", "Category", "Price", "Stock", "Description"]
+    headers = ["Name", "Category", "Price", "Stock", "Description", "Barcode"]
     ws.append(headers)
     for cell in ws[1]:
         cell.font = Font(bold=True)
 
     # Sample data
-    ws.append(["Produk Contoh 1", "Elektronik", 150000, 10, "Deskripsi contoh"])
-    ws.append(["Produk Contoh 2", "Makanan", 25000, 50, "Snack enak"])
+    ws.append(
+        ["Produk Contoh 1", "Elektronik", 150000, 10, "Deskripsi contoh", "8991234567890"]
+    )
+    ws.append(["Produk Contoh 2", "Makanan", 25000, 50, "Snack enak", ""])
 
     # Save to buffer
     buffer = BytesIO()
@@ -955,34 +1123,216 @@ def product_import_template(request):
     return response
 
 
-def require_api_key(view_func):
-    @wraps(view_func)
-    def _wrapped(request, *args, **kwargs):
-        # Check X-API-KEY header (also accept HTTP_X_API_KEY for older servers)
-        key = request.headers.get("X-API-KEY") or request.META.get("HTTP_X_API_KEY")
-        if not key or key != getattr(settings, "API_KEY", None):
-            return HttpResponseForbidden("Invalid or missing API key")
-        return view_func(request, *args, **kwargs)
+def require_api_key(view_func=None, *, scope=ApiKey.SCOPE_READ):
+    """Allow requests with an active API key that has ``scope``.
+
+    The key's rate limit is applied before the view runs; the matched key
+    is available as ``request.api_key``. Use as ``@require_api_key`` or
+    ``@require_api_key(scope="write")``.
+    """
+    if view_func is None:
+        return lambda func: require_api_key(func, scope=scope)
+
+    if iscoroutinefunction(view_func):
+
+        @wraps(view_func)
+        async def _wrapped(request, *args, **kwargs):
+            request.api_key = await apikeys.aauthenticate(apikeys.presented_key(request))
+            denied = apikeys.verdict(request.api_key, scope)
+            if denied:
+                return denied
+            return await view_func(request, *args, **kwargs)
+
+    else:
+
+        @wraps(view_func)
+        def _wrapped(request, *args, **kwargs):
+            request.api_key = apikeys.authenticate(apikeys.presented_key(request))
+            denied = apikeys.verdict(request.api_key, scope)
+            if denied:
+                return denied
+            return view_func(request, *args, **kwargs)
 
     return _wrapped
 
 
+def require_api_key_or_login(view_func):
+    """Like ``require_api_key`` but also lets logged-in users (the till) in.
+
+    A request that sends a key is checked (and rate limited) as that key.
+    """
+    keyed = require_api_key(view_func)
+    if iscoroutinefunction(view_func):
+
+        @wraps(view_func)
+        async def _wrapped(request, *args, **kwargs):
+            if apikeys.presented_key(request) or not await _is_authenticated(request):
+                return await keyed(request, *args, **kwargs)
+            return await view_func(request, *args, **kwargs)
+
+    else:
+
+        @wraps(view_func)
+        def _wrapped(request, *args, **kwargs):
+            if apikeys.presented_key(request) or not request.user.is_authenticated:
+                return keyed(request, *args, **kwargs)
+            return view_func(request, *args, **kwargs)
+
+    return _wrapped
+
+
+def _api_limit(request, default=100, maximum=500):
+    try:
+        return max(1, min(int(request.GET.get("limit", default)), maximum))
+    except ValueError:
+        return default
+
+
+@require_api_key
+@compressed
+@catalog_conditional
+async def api_products(request):
+    """Return JSON list of products.
+
+    Passing ``limit`` or ``cursor`` switches to keyset pagination (newest
+    first) and adds ``next_cursor`` to the response.
+    """
+    fields = ("id", "name", "price", "stock", "description")
+    if "limit" not in request.GET and "cursor" not in request.GET:
+        data = [row async for row in Product.objects.values(*fields)]
+        return FastJsonResponse({"products": data})
+
+    try:
+        page = await akeyset_paginate(
+            Product.objects.only(*fields, "created_at"),
+            request.GET.get("cursor"),
+            per_page=_api_limit(request),
+        )
+    except InvalidCursor:
+        return HttpResponseBadRequest("Invalid cursor")
+    data = [{f: getattr(p, f) for f in fields} for p in page]
+    return FastJsonResponse({"products": data, "next_cursor": page.next_cursor})
+
+
+@require_api_key
+@compressed
+@catalog_conditional
+async def api_product_changes(request):
+    """Catalog delta sync: ``?since=<seq>&limit=500``.
+
+    Returns products inserted, updated or deleted (as ``{"id", "deleted":
+    true}`` tombstones) after change ``since``, oldest first. Tills store
+    ``next_since`` and poll again with it; ``since=0`` pages through the
+    whole catalog for a first sync.
+    """
+    try:
+        since = int(request.GET.get("since", 0))
+    except ValueError:
+        return HttpResponseBadRequest("Invalid since")
+    changes, next_since, has_more = await sync_to_async(changefeed.changes_since)(
+        since, _api_limit(request, default=500, maximum=2000)
+    )
+    return FastJsonResponse(
+        {"changes": changes, "next_since": next_since, "has_more": has_more}
+    )
+
+
+@require_api_key_or_login
+@compressed
+def api_product_suggest(request):
+    """Autocomplete products by name prefix: ``?q=ind gor&limit=20``."""
+    query = request.GET.get("q", "").strip()
+    limit = _api_limit(request, default=20, maximum=50)
+    return FastJsonResponse({"results": suggest.suggest(query, limit) if query else []})
+
+
+@require_api_key_or_login
+async def api_product_by_barcode(request, code):
+    """Look up one product by scanned barcode, from the cache when possible."""
+    product = await sync_to_async(barcodes.lookup)(code)
+    if product is None:
+        raise Http404("No Product matches the given barcode.")
+    return FastJsonResponse(product)
+
+
 @require_api_key
-def api_products(request):
-    """Return JSON list of products."""
-    data = list(Product.objects.values("id", "name", "price", "stock", "description"))
-    return JsonResponse({"products": data})
+@compressed
+async def api_orders(request):
+    """Return a keyset-paginated JSON list of orders, newest first.
+
+    Query params: ``cursor`` (from a previous ``next_cursor``) and ``limit``
+    (default 100, max 500). ``count`` is omitted when
+    PAGINATION_EXACT_COUNT is off.
+    """
+    try:
+        page = await akeyset_paginate(
+            Order.objects.all(), request.GET.get("cursor"), per_page=_api_limit(request)
+        )
+    except InvalidCursor:
+        return HttpResponseBadRequest("Invalid cursor")
+    data = [
+        {
+            "id": o.id,
+            "customer": o.customer_id,
+            "total_price": o.total_price,
+            "created_at": o.created_at,
+        }
+        for o in page
+    ]
+    payload = {"orders": data, "next_cursor": page.next_cursor}
+    if settings.PAGINATION_EXACT_COUNT:
+        payload["count"] = await Order.objects.acount()
+    return FastJsonResponse(payload)
 
 
 @require_api_key
+async def api_order_detail(request, pk):
+    """One order with its lines, e.g. for a till reprinting a receipt."""
+    try:
+        order = await Order.objects.aget(pk=pk)
+    except Order.DoesNotExist:
+        raise Http404("No Order matches the given query.")
+    items = [
+        {
+            "product": item.product_id,
+            "name": item.product.name,
+            "quantity": item.quantity,
+            "price": item.price,
+            "discount_percent": item.discount_percent,
+        }
+        async for item in order.items.select_related("product")
+    ]
+    return FastJsonResponse(
+        {
+            "id": order.id,
+            "customer": order.customer_id,
+            "total_price": order.total_price,
+            "created_at": order.created_at,
+            "items": items,
+        }
+    )
+
+
+@require_api_key(scope=ApiKey.SCOPE_WRITE)
 @require_http_methods(["POST"])
 def api_create_order(request):
     """Create an order from JSON POST.
 
     Expected JSON: {"customer": id, "items": [{"product": id, "quantity": n}, ...]}
+
+    An optional Idempotency-Key header makes retries safe: a replayed key
+    returns the original order_id without touching stock.
     """
     import json
 
+    idem_key = request.headers.get("Idempotency-Key", "").strip()
+    if idem_key:
+        if len(idem_key) > 255:
+            return HttpResponseBadRequest("Idempotency-Key too long")
+        order_id = idempotency.lookup(idem_key)
+        if order_id is not None:
+            return FastJsonResponse({"status": "ok", "order_id": order_id})
+
     try:
         payload = json.loads(request.body)
     except Exception:
@@ -995,32 +1345,84 @@ def api_create_order(request):
 
     customer = get_object_or_404(Customer, pk=customer_id)
 
-    # Validate stock and prepare items
-    items_data = []
+    lines = []
     for it in items:
         pid = it.get("product")
         qty = int(it.get("quantity", 0))
         if not pid or qty <= 0:
             continue
-        prod = get_object_or_404(Product, pk=pid)
-        if prod.stock < qty:
-            return HttpResponseBadRequest(
-                f"Insufficient stock for product: {prod.name}"
-            )
-        items_data.append((prod, qty))
+        lines.append((pid, qty, 0))
 
-    with transaction.atomic():
-        total = Decimal("0")
-        for prod, qty in items_data:
-            total += prod.price * qty
+    try:
+        with transaction.atomic():
+            order, _ = place_order(customer, lines)
+            if idem_key:
+                idempotency.remember(idem_key, order)
+    except UnknownProduct:
+        raise Http404("No Product matches the given query.")
+    except CheckoutError as exc:
+        return HttpResponseBadRequest(str(exc))
+    except IntegrityError:
+        # A concurrent retry with the same key committed first; our order
+        # and its stock reservation were rolled back, so answer with theirs.
+        order_id = idempotency.lookup(idem_key)
+        if order_id is None:
+            raise
+        return FastJsonResponse({"status": "ok", "order_id": order_id})
+
+    return FastJsonResponse({"status": "ok", "order_id": order.id})
+
+
+# Upper bound on orders per batch request, so one flush cannot hold the
+# database for an unbounded amount of time.
+MAX_BATCH_ORDERS = 1000
+
+
+@require_api_key(scope=ApiKey.SCOPE_WRITE)
+@require_http_methods(["POST"])
+def api_create_orders_batch(request):
+    """Create many orders from one JSON POST (offline till flush).
 
-        order = Order.objects.create(customer=customer, total_price=total)
-        for prod, qty in items_data:
-            OrderItem.objects.create(
-                order=order, product=prod, quantity=qty, price=prod.price
-            )
-            # decrease stock
-            prod.stock = prod.stock - qty
-            prod.save(update_fields=["stock"])
+    Expected JSON: {"orders": [{"customer": id, "items": [...]}, ...]} where
+    each entry has the same shape as the api_create_order payload.
+    Returns {"results": [...]} with one entry per order, in input order:
+    {"status": "ok", "order_id": n} or {"status": "error", "error": "..."}.
+    """
+    try:
+        payload = json.loads(request.body)
+        entries = payload["orders"]
+    except Exception:
+        return HttpResponseBadRequest("Invalid JSON")
+
+    if not isinstance(entries, list) or not entries:
+        return HttpResponseBadRequest("Missing fields")
+    if len(entries) > MAX_BATCH_ORDERS:
+        return HttpResponseBadRequest(
+            f"Too many orders (max {MAX_BATCH_ORDERS} per request)"
+        )
+
+    results = [None] * len(entries)
+    baskets = []
+    positions = []
+    for idx, entry in enumerate(entries):
+        try:
+            customer_id = int(entry.get("customer"))
+            lines = []
+            for it in entry.get("items", []):
+                pid = int(it.get("product"))
+                qty = int(it.get("quantity", 0))
+                if qty > 0:
+                    lines.append((pid, qty, 0))
+        except Exception:
+            results[idx] = {"status": "error", "error": "Invalid order"}
+            continue
+        baskets.append((customer_id, lines))
+        positions.append(idx)
+
+    for idx, (order, error) in zip(positions, place_order_batch(baskets)):
+        if error is None:
+            results[idx] = {"status": "ok", "order_id": order.id}
+        else:
+            results[idx] = {"status": "error", "error": str(error)}
 
-    return JsonResponse({"status": "ok", "order_id": order.id})
+    return FastJsonResponse({"results": results})